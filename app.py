@@ -3,6 +3,7 @@ from components.settings import render_settings
 from components.chatbot import render_chatbot
 from components.info_panel import render_info_panel
 from utils.ui import init_page_config
+from utils.text_compression import shared_compressor
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -32,6 +33,9 @@ def main():
     # Initialize session state
     initialize_session_state()
     
+    # Load the shared LLMLingua model in the background (once per process)
+    shared_compressor.start_loading()
+    
     # Render settings in sidebar
     render_settings()
     
@@ -1,28 +1,41 @@
 import re
+from typing import Optional
 from autogen import AssistantAgent
-from config import CONFIG_LIST
 from prompts.critics import CRITIC_DESCRIPTION, CRITIC_MESSAGE, REFLECTION_MESSAGE
+from utils.llm_governor import Priority, govern_agent
+from utils.model_router import get_llm_config, record_step_latency
 
 class CriticAgent(AssistantAgent):
     def __init__(self):
         super().__init__(
             name =  "critic_agent",
-            llm_config={"config_list": CONFIG_LIST},
+            llm_config=get_llm_config("critic"),
             system_message=CRITIC_MESSAGE,
             description=CRITIC_DESCRIPTION
         )
+        record_step_latency(self, "critic")
+        govern_agent(self, priority=Priority.AGENT)
         
 def reflection_message(recipient, messages, sender, config):
         print(f"Critic Agent Reflecting ...", "yellow")
-        message = REFLECTION_MESSAGE
         last_message = recipient.chat_messages_for_summary(sender)[-1]['content']
         user_said = recipient.chat_messages_for_summary(sender)[0]['content']
-        match = re.search(r"User:\s\"(.*?)\"", user_said)
-        if match:
-            user_said = match.group(1)
-            
-        return f"""
-        <researcher's response> \n{last_message} \n <researcher's response>
-        {message} \n
-        <user's message> \n{user_said}\n </user's message>
-        """
\ No newline at end of file
+        return build_reflection_prompt(response=last_message, user_message=user_said)
+
+def build_reflection_prompt(response: str, user_message: str) -> str:
+    match = re.search(r"User:\s\"(.*?)\"", user_message)
+    if match:
+        user_message = match.group(1)
+        
+    return f"""
+    <researcher's response> \n{response} \n <researcher's response>
+    {REFLECTION_MESSAGE} \n
+    <user's message> \n{user_message}\n </user's message>
+    """
+
+def parse_critic_score(critique: str) -> Optional[float]:
+    """Return the last "SCORE: n" in a critique clamped to [0, 10], or None if there is none."""
+    matches = re.findall(r"SCORE:\s*\**\s*(\d+(?:\.\d+)?)", critique or "", re.IGNORECASE)
+    if not matches:
+        return None
+    return min(max(float(matches[-1]), 0.0), 10.0)
@@ -1,18 +1,64 @@
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from typing_extensions import Annotated
 from autogen import AssistantAgent
-from config import CONFIG_LIST, SnowflakeConfig
-from prompts.documents_reading_agent import DOCUMENTS_READING_SYSTEM_DESCRIPTION, DOCUMENTS_READING_SYSTEM_MESSAGE
+from config import SnowflakeConfig
+from prompts.documents_reading_agent import (
+    CHUNK_EXTRACTION_PROMPT,
+    DOCUMENTS_READING_SYSTEM_DESCRIPTION,
+    DOCUMENTS_READING_SYSTEM_MESSAGE,
+    EXTRACTION_MERGE_PROMPT,
+    NO_RELEVANT_INFORMATION,
+)
+from utils import tracing
+from utils.llm_governor import Priority, govern_agent
+from utils.lru_cache import LRUCache
+from utils.model_router import get_llm_config, record_step_latency, reply_text
+
+# Shared by all DocumentReadingAgents for the per-chunk (map) extractions
+document_map_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="document-map")
+# (chunk hash, query) -> extraction, None when the chunk had nothing relevant
+chunk_extraction_cache = LRUCache(max_items=1024)
+# One map agent per document_map_executor thread, so map calls never share an agent
+_map_agents = threading.local()
+
+def get_chunk_extractor() -> AssistantAgent:
+    """Return the calling thread's chunk extraction agent, building it on first use."""
+    agent = getattr(_map_agents, "agent", None)
+    if agent is None:
+        agent = AssistantAgent(
+            name="document_map_agent",
+            llm_config=get_llm_config("document_map"),
+            system_message=DOCUMENTS_READING_SYSTEM_MESSAGE,
+        )
+        record_step_latency(agent, "document_map")
+        govern_agent(agent, priority=Priority.AGENT)
+        _map_agents.agent = agent
+    return agent
 
 class DocumentReadingAgent(AssistantAgent):
-    def __init__(self):
+    def __init__(self, map_reduce: bool = True):
+        """
+        Args:
+            map_reduce (bool): Extract from each retrieved chunk concurrently on the
+                small model and merge the results, instead of one call over all chunks
+        """
         super().__init__(
             name="document_reading_agent",
-            llm_config={"config_list": CONFIG_LIST},
+            llm_config=get_llm_config("document_reading"),
             description=DOCUMENTS_READING_SYSTEM_MESSAGE,
             system_message = DOCUMENTS_READING_SYSTEM_DESCRIPTION
         )
+        record_step_latency(self, "document_reading")
+        govern_agent(self, priority=Priority.AGENT)
+        self.map_reduce = map_reduce
         
     def get_relevant_information(self, message: str, retrieve_relevant_documents: Annotated[list, "Search results"]) -> str:
+        if self.map_reduce and len(retrieve_relevant_documents) > 1:
+            return self._map_reduce(message, retrieve_relevant_documents)
         doc_message = f"""
             User's: '{message}'
             Retrieved relevant documents: {retrieve_relevant_documents}\n
@@ -24,8 +70,69 @@ class DocumentReadingAgent(AssistantAgent):
             
             """
         response = self.generate_reply(messages = [{"role": "assistant", "content": doc_message}])
-        response = response['content']
-        return response
+        return reply_text(response)
+
+    def _map_reduce(self, message: str, documents: list) -> str:
+        """Extract from every chunk in parallel, drop empty ones, then merge in one call.
+
+        Latency follows the slowest chunk rather than the total context size: map calls
+        run on the small model, which has its own rate-limit bucket, so they are not
+        paced by the large model's limit. Chunk extractions are cached per (chunk,
+        query), so follow-ups that retrieve the same chunks only pay for the merge.
+        """
+        futures = [
+            tracing.submit_in_context(document_map_executor, self._extract_chunk, message, document)
+            for document in documents
+        ]
+        extractions = []
+        for document, future in zip(documents, futures):
+            try:
+                extraction = future.result()
+            except Exception as e:
+                print(f"Chunk extraction failed for {_chunk_source(document)}: {e}")
+                continue
+            if extraction:
+                extractions.append((_chunk_source(document), extraction))
+        print(f"Document map: {len(extractions)} of {len(documents)} chunks relevant")
+
+        if not extractions:
+            return ""
+        if len(extractions) == 1:
+            source, extraction = extractions[0]
+            return f"{extraction}\nSource: {source}"
+        merge_message = EXTRACTION_MERGE_PROMPT.format(
+            message=message,
+            extractions="\n\n".join(f"[{source}]\n{extraction}" for source, extraction in extractions),
+        )
+        with tracing.span("document_reduce", span_type="generation", chunks=len(extractions)):
+            response = self.generate_reply(messages = [{"role": "assistant", "content": merge_message}])
+        return reply_text(response)
+
+    def _extract_chunk(self, message: str, document) -> Optional[str]:
+        key = (_chunk_hash(document), message)
+        if key in chunk_extraction_cache:
+            tracing.increment("chunk_cache_hits")
+            return chunk_extraction_cache.get(key)
+        tracing.increment("chunk_cache_misses")
+        chunk = document.get("chunk", "") if isinstance(document, dict) else str(document)
+        with tracing.span("document_map", span_type="generation", source=_chunk_source(document)):
+            response = get_chunk_extractor().generate_reply(messages=[{
+                "role": "user",
+                "content": CHUNK_EXTRACTION_PROMPT.format(message=message, source=_chunk_source(document), chunk=chunk),
+            }])
+        extraction = reply_text(response).strip()
+        if not extraction or extraction.strip('"\'').lower().startswith(NO_RELEVANT_INFORMATION.lower().rstrip(".")):
+            extraction = None
+        chunk_extraction_cache.put(key, extraction)
+        return extraction
+
+def _chunk_hash(document) -> str:
+    return hashlib.sha256(json.dumps(document, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+def _chunk_source(document) -> str:
+    if isinstance(document, dict):
+        return document.get("relative_path") or "unknown"
+    return "unknown"
         
 # def retrieve_relevant_documents(query: Annotated[str, "Search query for relevant documents"]) -> Annotated[str, "Search results"]:
 #     """
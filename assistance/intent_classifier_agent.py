@@ -1,24 +1,25 @@
-from config import CONFIG_LIST
 from autogen import AssistantAgent
+from prompts.intent_classifier import INTENT_SYSTEM_MESSAGE
+from utils.llm_governor import Priority, govern_agent
+from utils.local_intent_classifier import local_intent_classifier, normalize_intent
+from utils.model_router import get_llm_config, record_step_latency, reply_text
 
 class IntentClassifier(AssistantAgent):
-    def __init__(self):
+    def __init__(self, confidence_threshold: float = 0.6):
         super().__init__(
             name="intent_classifier",
-            llm_config={"config_list": CONFIG_LIST},
-            system_message="""    
-            Your role is to classify user intents into one of these categories:
-            - uploaded_document_read: queries requiring retrieved user's uploaded documents to answer questions
-            - papers_search: quieries requiring searching for papers on axvir or web 
-            - web_search: queries requiring real-time online search on the web
-            - general: General queries that don't fit the above categories
-            
-            Respond with the category name only.
-            """
+            llm_config=get_llm_config("intent_classifier"),
+            system_message=INTENT_SYSTEM_MESSAGE
         )
+        record_step_latency(self, "intent_classifier")
+        govern_agent(self, priority=Priority.AGENT)
+        # Local predictions below this confidence are escalated to the LLM
+        self.confidence_threshold = confidence_threshold
         
     def classify(self, message: str) -> str:
+        intent, confidence = local_intent_classifier.predict(message)
+        if intent is not None and confidence >= self.confidence_threshold:
+            return intent
         # process classification on the intent
         response = self.generate_reply(messages = [{"role": "assistant", "content": message}])
-        return response['content']
-    
\ No newline at end of file
+        return normalize_intent(reply_text(response))
@@ -1,18 +1,77 @@
 import arxiv
+import contextvars
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Optional
+import requests
 from typing_extensions import Annotated
 from autogen import AssistantAgent
 
-from config import CONFIG_LIST
+from config import ArxivConfig
 from prompts.paper_search_agent import PAPERS_SEARCH_DESCRIPTION, PAPERS_SEARCH_SYSTEM_MESSAGE
+from utils import tracing
+from utils.arxiv_cache import ARXIV_ID_PATTERN, get_arxiv_cache
+from utils.deadline import bounded_timeout
+from utils.llm_governor import Priority, govern_agent
+from utils.model_router import get_llm_config, record_step_latency, reply_text
+
+arxiv_config = ArxivConfig()
+
+# Monotonic time by which the arXiv requests of the current keyword search must be done
+_request_expires_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "arxiv_request_expires_at", default=None
+)
+
+class ArxivSession(requests.Session):
+    """HTTP session for the arXiv API shared by all threads.
+
+    `arxiv.Client` paces requests through unsynchronized per-client state, so
+    concurrent searches on one client fire together. This session takes over the
+    pacing: every request reserves the next slot `min_interval_s` after the previous
+    one under a lock, then sleeps outside it. Every request also gets a timeout, cut
+    to the remaining budget of the keyword search it belongs to; a search whose budget
+    runs out while waiting for its slot fails with `requests.Timeout` without sending.
+    """
+    def __init__(self, min_interval_s: float, timeout_s: float):
+        super().__init__()
+        self.min_interval_s = min_interval_s
+        self.timeout_s = timeout_s
+        self._pacing_lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def request(self, method, url, **kwargs):
+        expires_at = _request_expires_at.get()
+        with self._pacing_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            if expires_at is not None and slot >= expires_at:
+                raise requests.Timeout(f"arXiv request budget exhausted before its slot ({slot - now:.1f}s away)")
+            self._next_slot = slot + self.min_interval_s
+        time.sleep(slot - now)
+        timeout = self.timeout_s
+        if expires_at is not None:
+            timeout = min(timeout, max(0.1, expires_at - time.monotonic()))
+        kwargs.setdefault("timeout", timeout)
+        return super().request(method, url, **kwargs)
+
+# Shared by every search so the HTTP session is reused across keywords and queries.
+# The client's own delay is off: pacing happens in the session, across threads.
+arxiv_client = arxiv.Client(delay_seconds=0.0, num_retries=2)
+arxiv_client._session = ArxivSession(arxiv_config.min_request_interval_s, arxiv_config.request_timeout_s)
+arxiv_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="arxiv")
 
 class PaperSearchAgent(AssistantAgent):
     def __init__(self):
         super().__init__(
             name="paper_search_agent",
-            llm_config={"config_list": CONFIG_LIST},
+            llm_config=get_llm_config("paper_search"),
             description= PAPERS_SEARCH_SYSTEM_MESSAGE,
             system_message = PAPERS_SEARCH_DESCRIPTION
         )
+        record_step_latency(self, "paper_search")
+        govern_agent(self, priority=Priority.AGENT)
         
         self.register_for_llm(name="fetch_arxiv_papers", description=(
             "Performs a search for papers and articles on Arxiv database using the arxiv package."
@@ -73,13 +132,13 @@ class PaperSearchAgent(AssistantAgent):
             Answer:
         """
         keywords = self.generate_reply(messages = [{"role": "user", "content": search_keywords_prompt}])
-        keywords = keywords['content']
+        keywords = reply_text(keywords)
         keywords = keywords.split(",")
         print("keywords: ", keywords)
-        papers = []
-        for i in range(min(5, len(keywords))):
-            keyword = keywords[i].strip()
-            papers.append(fetch_arxiv_papers(title=keyword, papers_count=5))
+        keywords = [keyword.strip() for keyword in keywords[:5] if keyword.strip()]
+        papers = fetch_arxiv_papers_for_keywords(
+            keywords, papers_count=5, timeout=bounded_timeout(arxiv_config.keyword_timeout_s),
+        )
         print("paper result: ", papers)
         paper_prompt = f"""
             Available papers are below.\n
@@ -93,8 +152,7 @@ class PaperSearchAgent(AssistantAgent):
             Answer:
         """
         response = self.generate_reply(messages = [{"role": "assistant", "content": paper_prompt}])
-        response = response['content']
-        return response
+        return reply_text(response)
         
 def fetch_arxiv_papers(
     title: Annotated[str, "title or search keyword for the relevant papers or articles"], 
@@ -110,13 +168,41 @@ def fetch_arxiv_papers(
     :param papers_count: int, number of papers to fetch.
     :return: list, search results.
     """
-    import re
+    return _search_arxiv(title, papers_count, time.monotonic() + arxiv_config.keyword_timeout_s)
+
+def _search_arxiv(title: str, papers_count: int, expires_at: float) -> list:
+    """`fetch_arxiv_papers` whose arXiv requests must finish by `expires_at` (monotonic)."""
+    token = _request_expires_at.set(expires_at)
+    try:
+        return _fetch_arxiv_papers(title, papers_count)
+    finally:
+        _request_expires_at.reset(token)
+
+def _fetch_arxiv_papers(title: str, papers_count: int) -> list:
+    cache = get_arxiv_cache()
+    if ARXIV_ID_PATTERN.match(title.strip()):
+        paper = cache.get_paper(title.strip())
+        tracing.increment("arxiv_cache_hits" if paper is not None else "arxiv_cache_misses")
+        if paper is None and not cache.offline:
+            paper = next((_to_paper_info(result) for result in arxiv_client.results(arxiv.Search(id_list=[title.strip()]))), None)
+            if paper is not None:
+                cache.put_papers([paper])
+        if paper is not None or cache.offline:
+            return [paper] if paper else []
+
     cleaned = re.sub(r'[^a-zA-Z0-9\s\.]', ' ', title) # Keep alphanumeric, spaces, and some safe characters
     cleaned = re.sub(r'\s+', ' ', cleaned) # Replace multiple spaces with single space
     cleaned = cleaned.strip()
     terms = cleaned.split()
     query_terms = f'("{" AND ".join(terms)}")'
     search_query = f'all:"{query_terms}"'
+    cached = cache.get_search(search_query, papers_count)
+    tracing.increment("arxiv_cache_hits" if cached is not None else "arxiv_cache_misses")
+    if cached is not None:
+        return cached
+    if cache.offline:
+        # Never searched for these words: search the titles and abstracts already cached
+        return cache.search_local(cleaned, limit=papers_count)
     search = arxiv.Search(
         query=search_query,
         max_results=papers_count,
@@ -125,18 +211,78 @@ def fetch_arxiv_papers(
     )
 
     papers = []
-    # Use the Client for searching
-    client = arxiv.Client()
-    
     # Execute the search
-    search = client.results(search)
+    try:
+        for result in arxiv_client.results(search):
+            papers.append(_to_paper_info(result))
+    except (arxiv.ArxivError, requests.RequestException) as e:
+        local = cache.search_local(cleaned, limit=papers_count)
+        print(f"arXiv search for '{cleaned}' failed, using {len(local)} cached papers: {e}")
+        tracing.increment("arxiv_local_fallbacks")
+        return local
+
+    cache.put_search(search_query, papers_count, papers)
+    return papers
+
+def _to_paper_info(result: arxiv.Result) -> dict:
+    return {
+        'id': re.sub(r'v\d+$', '', result.get_short_id()),
+        'title': result.title,
+        'summary': result.summary,
+        'pdf_url': result.pdf_url
+    }
+
+def fetch_arxiv_papers_for_keywords(
+    keywords: List[str],
+    papers_count: int = 5,
+    timeout: Optional[float] = None,
+    max_papers: int = 10,
+    max_summary_chars: int = 1200,
+) -> list:
+    """
+    Search arXiv for several keywords concurrently and merge the results.
+
+    :param keywords: list, search keywords, most important first.
+    :param papers_count: int, number of papers to fetch per keyword.
+    :param timeout: float, budget of every keyword search, counted from submission and
+        enforced on its HTTP requests (ArxivConfig.keyword_timeout_s if None); slower
+        keywords are dropped.
+    :param max_papers: int, maximum number of papers returned.
+    :param max_summary_chars: int, summaries are cut to this length.
+    :return: list, papers deduplicated by arXiv id.
+    """
+    timeout = arxiv_config.keyword_timeout_s if timeout is None else timeout
+    expires_at = time.monotonic() + timeout
+    futures = [
+        tracing.submit_in_context(arxiv_executor, _search_arxiv, keyword, papers_count, expires_at)
+        for keyword in keywords
+    ]
+    # Running searches stop on their own by expires_at; queued ones are cancelled
+    done, not_done = wait(futures, timeout=timeout)
+    for future in not_done:
+        future.cancel()
+    if not_done:
+        print(f"arXiv search timed out for {len(not_done)} of {len(futures)} keywords")
 
-    for result in search:
-        paper_info = {
-                'title': result.title,
-                'summary': result.summary,
-                'pdf_url': result.pdf_url
-            }
-        papers.append(paper_info)
+    results = []
+    for future in futures:
+        if future in done and future.exception() is None:
+            results.append(future.result())
+        elif future in done:
+            print(f"arXiv search failed: {future.exception()}")
 
-    return papers
\ No newline at end of file
+    # Take papers round-robin so every keyword contributes its best matches
+    papers, seen = [], set()
+    for rank in range(papers_count):
+        for keyword_papers in results:
+            if rank >= len(keyword_papers) or len(papers) >= max_papers:
+                continue
+            paper = keyword_papers[rank]
+            if paper['id'] in seen:
+                continue
+            seen.add(paper['id'])
+            summary = paper['summary'].replace("\n", " ")
+            if len(summary) > max_summary_chars:
+                summary = summary[:max_summary_chars].rsplit(" ", 1)[0] + "..."
+            papers.append({**paper, 'summary': summary})
+    return papers
@@ -2,12 +2,26 @@ from autogen import AssistantAgent
 from typing_extensions import Annotated
 from duckduckgo_search import DDGS
 import random
-from config import APIFY_KEY, CONFIG_LIST
+from config import APIFY_KEY, CONFIG_LIST, WebScraperConfig
 from prompts.web_search_agent import WEB_SEARCH_DESCRIPTION, WEB_SEARCH_SYSTEM_MESSAGE
 from utils.custom_actor_client import CustomApifyClient
+from utils import tracing
+from utils.deadline import bounded_timeout
+from utils.llm_governor import Priority, govern_agent
+from utils.web_cache import get_web_cache
+from utils.web_extractor import PageFetcher
 from autogen import AssistantAgent
 from datetime import datetime
 
+scraper_config = WebScraperConfig()
+# Shared by all sessions so HTTP connections are pooled across searches
+page_fetcher = PageFetcher(
+    request_timeout_s=scraper_config.request_timeout_s,
+    per_host_limit=scraper_config.per_host_limit,
+    max_connections=scraper_config.max_connections,
+    cache=get_web_cache(),
+)
+
 class WebSearchAgent(AssistantAgent):
     def __init__(self):
         model = CONFIG_LIST[1]
@@ -17,6 +31,7 @@ class WebSearchAgent(AssistantAgent):
             system_message=WEB_SEARCH_SYSTEM_MESSAGE,
             description=WEB_SEARCH_DESCRIPTION
         )
+        govern_agent(self, priority=Priority.AGENT)
     
         self.register_for_llm(name="search_internet", description=(
                 "Perform a web search to find relevant content if there is no sufficient information in the context for answering the question. "
@@ -58,6 +73,36 @@ def get_headers() -> dict:
     }
     
 def scrape_page(urls: list[Annotated[str, "The URL of the web page to scrape"]]) -> Annotated[dict, "Scraped content"]:
+    """Scrape pages with the configured backend. `urls` uses the Apify startUrls format."""
+    with tracing.span("scrape", span_type="retrieval", backend=scraper_config.backend, urls=len(urls)):
+        return _scrape_page(urls)
+
+def _scrape_page(urls: list) -> list:
+    if scraper_config.backend == "apify":
+        # The actor gives us no validators, so only fresh cache entries are reused
+        web_cache = get_web_cache()
+        hits = []
+        for u in urls:
+            cached = web_cache.get_page(u["url"])
+            if cached is not None and cached["fresh"]:
+                hits.append(cached["content"])
+        cached_urls = {item["url"] for item in hits}
+        misses = [u for u in urls if u["url"] not in cached_urls]
+        tracing.increment("web_cache_hits", len(hits))
+        results = scrape_page_apify(misses) if misses else []
+        for item in results:
+            web_cache.put_page(item["url"], item)
+        return hits + results
+    # Let httpx negotiate the encodings it can decode
+    headers = {k: v for k, v in get_headers().items() if k != "Accept-Encoding"}
+    fetched = page_fetcher.fetch_with_cache_status(
+        [u["url"] for u in urls], headers=headers, timeout=bounded_timeout(scraper_config.request_timeout_s),
+    )
+    tracing.increment("web_cache_hits", sum(from_cache for page, from_cache in fetched if page is not None))
+    results = [page for page, _ in fetched if page is not None]
+    return [item for item in results if item.get('title') is not None and item.get('title') != '403 Forbidden']
+
+def scrape_page_apify(urls: list[Annotated[str, "The URL of the web page to scrape"]]) -> Annotated[dict, "Scraped content"]:
     # Initialize the ApifyClient with your API token
         
     client = CustomApifyClient(token=APIFY_KEY, headers=get_headers())
@@ -81,7 +126,7 @@ def scrape_page(urls: list[Annotated[str, "The URL of the web page to scrape"]])
             "    # Initialize data structure\n"
             "    data = {\n"
             "        'url': url,\n"
-            "        'title': soup.title.string.strip() if soup.title else None,\n"
+            "        'title': soup.title.string.strip() if soup.title and soup.title.string else None,\n"
             "        'content': {},\n"
             "    }\n"
             "    \n"
@@ -89,7 +134,7 @@ def scrape_page(urls: list[Annotated[str, "The URL of the web page to scrape"]])
             "    # Find main content area with multiple fallback options\n"
             "    main_content = None\n"
             "    for selector in ['main', 'article', '#content', '.content', 'body']:\n"
-            "        main_content = soup.find(selector)\n"
+            "        main_content = soup.select_one(selector)\n"
             "        if main_content:\n"
             "            break\n"
             "    \n"
@@ -154,8 +199,9 @@ def scrape_page(urls: list[Annotated[str, "The URL of the web page to scrape"]])
         }
     }
 
-    # Run the Actor and wait for it to finish
-    run = actor_client.call(run_input=ACTOR_INPUT)
+    # Run the Actor and wait for it to finish, no longer than the request deadline allows
+    actor_timeout = int(bounded_timeout(scraper_config.apify_timeout_s, floor_s=5))
+    run = actor_client.call(run_input=ACTOR_INPUT, timeout_secs=actor_timeout, wait_secs=actor_timeout)
 
     # Fetch and return results
     results = []
@@ -178,11 +224,16 @@ def search_internet(query:str, max_results: Annotated[int, "Number of web to scr
     :param max_results: int, maximum number of results to return.
     :return: list, search results.
     """
-    with DDGS(headers=get_headers()) as ddgs:
-        urls = [{"url": r['href']} for r in ddgs.text(query, max_results=max_results)]
-        #print(f"============ SCRAPING URLS: {urls} =============== \n")
-        res = scrape_page(urls=urls)
-        return res
+    web_cache = get_web_cache()
+    urls = web_cache.get_search(query, max_results)
+    tracing.increment("search_cache_hits" if urls is not None else "search_cache_misses")
+    if urls is None:
+        with DDGS(headers=get_headers(), timeout=int(bounded_timeout(scraper_config.search_timeout_s))) as ddgs:
+            urls = [{"url": r['href']} for r in ddgs.text(query, max_results=max_results)]
+        web_cache.put_search(query, max_results, urls)
+    #print(f"============ SCRAPING URLS: {urls} =============== \n")
+    res = scrape_page(urls=urls)
+    return res
 
 def get_current_date_time() -> Annotated[str, "Current date and time"]:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -1,16 +1,17 @@
-from autogen.agentchat.contrib.capabilities.text_compressors import LLMLingua
 from autogen.agentchat.contrib.capabilities.transforms import TextMessageCompressor
 from autogen.agentchat.contrib.capabilities import transforms, transform_messages
-from config import CONFIG_LIST
 from autogen import AssistantAgent
 from prompts.system_prompts import DEFAULT_ASSISTANT_PROMPT
 from prompts.writer_agent import WRITER_DESCRIPTION, WRITER_SYSTEM_MESSAGE
+from utils.llm_governor import Priority, govern_agent
+from utils.model_router import get_llm_config, record_step_latency
+from utils.text_compression import shared_compressor
 
 class WriterAgent(AssistantAgent):
     def __init__(self, name="writer_agent"):
         # config list
-        self.config_list = CONFIG_LIST
-        self.llm_config = {"config_list": CONFIG_LIST}
+        self.llm_config = get_llm_config("writer")
+        self.config_list = self.llm_config["config_list"]
         
         super().__init__(
             name=name,
@@ -18,6 +19,8 @@ class WriterAgent(AssistantAgent):
             system_message=DEFAULT_ASSISTANT_PROMPT,
             description = WRITER_DESCRIPTION,
         )
+        record_step_latency(self, "writer")
+        govern_agent(self, priority=Priority.INTERACTIVE)
         self.context_handler = self.add_context_handler()
         self.context_handler.add_to_agent(self)
     
@@ -29,11 +32,10 @@ class WriterAgent(AssistantAgent):
         max_tokens_per_message=8192
     ):
         
-        llm_lingua = LLMLingua()
+        # LLMLingua is loaded once per process and caches compressed messages
         text_compressor = TextMessageCompressor(
-            text_compressor=llm_lingua,
+            text_compressor=shared_compressor,
             compression_params={"target_token": target_token},
-            #cache=True
         )
 
         history_limiter = transforms.MessageHistoryLimiter(max_messages=max_messages)
@@ -0,0 +1,84 @@
+"""Offline accuracy/latency benchmark for the local intent classifier.
+
+Usage:
+    python benchmarks/intent_classifier_benchmark.py [--threshold 0.6] [--llm]
+
+Reads the labeled questions in test_questions.csv. Local accuracy is reported over the
+questions the local classifier answers (confidence at or above the threshold); the rest
+count as escalated. With --llm, escalated questions go to the LLM exactly like
+IntentClassifier.classify (requires the Streamlit secrets). Exits with an error if the
+embedding model cannot be loaded, rather than benchmarking the rules alone.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).parent.parent
+sys.path.append(str(ROOT))
+
+from utils.local_intent_classifier import local_intent_classifier
+
+def run_benchmark(csv_path: Path, threshold: float, use_llm: bool) -> pd.DataFrame:
+    questions = pd.read_csv(csv_path)
+    classifier = None
+    if use_llm:
+        from assistance.intent_classifier_agent import IntentClassifier
+        classifier = IntentClassifier(confidence_threshold=threshold)
+
+    # Load the embedding model outside of the timed loop
+    try:
+        local_intent_classifier.load()
+    except Exception as e:
+        raise SystemExit(f"Could not load the embedding model of the local intent classifier: {e}")
+    local_intent_classifier.predict("warm up")
+
+    rows = []
+    for question, expected in zip(questions["Question"], questions["Intent"]):
+        start = time.perf_counter()
+        predicted, confidence = local_intent_classifier.predict(question)
+        local_ms = (time.perf_counter() - start) * 1000
+        escalated = predicted is None or confidence < threshold
+        final, final_ms = (None if escalated else predicted), local_ms
+        if escalated and classifier is not None:
+            start = time.perf_counter()
+            final = classifier.classify(question)
+            final_ms = local_ms + (time.perf_counter() - start) * 1000
+        rows.append({
+            "question": question[:60],
+            "expected": expected,
+            "local": predicted,
+            "confidence": round(confidence, 3),
+            "escalated": escalated,
+            "final": final,
+            "local_ms": round(local_ms, 2),
+            "final_ms": round(final_ms, 2),
+        })
+    return pd.DataFrame(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--csv", type=Path, default=ROOT / "test_questions.csv")
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--llm", action="store_true", help="Escalate low-confidence questions to the LLM")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.csv, args.threshold, args.llm)
+    print(results.to_string(index=False))
+    confident = results[~results["escalated"]]
+    print()
+    if len(confident):
+        print(f"Accuracy above threshold:  {(confident['local'] == confident['expected']).mean():.2%} "
+              f"({len(confident)}/{len(results)} questions)")
+    else:
+        print(f"Accuracy above threshold:  n/a (0/{len(results)} questions)")
+    print(f"Escalation rate:           {results['escalated'].mean():.2%}")
+    if args.llm:
+        print(f"End-to-end accuracy:       {(results['final'] == results['expected']).mean():.2%}")
+    print(f"Local latency p50 / p95:   {results['local_ms'].quantile(0.5):.2f} / {results['local_ms'].quantile(0.95):.2f} ms")
+    print(f"End-to-end latency p50/p95: {results['final_ms'].quantile(0.5):.2f} / {results['final_ms'].quantile(0.95):.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,7 @@ from components.mindmap import MindMap
 from components.videorag import VideoRAG
 import codecs
 from utils.chat_utils import start_new_chat
+from utils.llm_governor import governed_complete
 
 def init_chat_history():
     """Initialize or retrieve chat history from session state.
@@ -193,7 +194,8 @@ class Chatbot:
 
         # Initialize VideoRAG
         self.video_rag = VideoRAG(self.mistral_client)
-        self.current_video_id = None
+        # Chatbot is rebuilt on every prompt, so the active video lives in session state
+        self.current_video_id = st.session_state.get('current_video_id')
 
     def is_mindmap_request(self, query: str) -> bool:
         """Detect if user query is requesting mind map visualization
@@ -254,7 +256,8 @@ class Chatbot:
         4. Display results
         """
         try:
-            response = self.mistral_client.chat.complete(
+            response = governed_complete(
+                self.mistral_client,
                 model="mistral-large-latest",
                 messages=[
                     {"role": "system", "content": VISUALIZATION_EXPERT_PROMPT},
@@ -298,10 +301,20 @@ class Chatbot:
         - Regular chat responses
         """
         try:
+            # Videos selected in the info panel, minus any evicted from the store since
+            selected_video_ids = [
+                video_id for video_id in st.session_state.get('selected_video_ids') or []
+                if self.video_rag.store.has_video(video_id)
+            ]
+
             # Check if query contains YouTube URL
             if is_youtube_url(query):
                 return self.video_rag.process_video_query(query)
             
+            # If videos are selected in the info panel, search across them
+            elif selected_video_ids and not self.is_mindmap_request(query):
+                return self.video_rag.query_videos(query, selected_video_ids)
+            
             # If we have a current video and the query seems to be about it
             elif self.current_video_id and not self.is_mindmap_request(query):
                 return self.video_rag.query_video(query, self.current_video_id)
@@ -315,7 +328,9 @@ class Chatbot:
             # Handle regular queries
             elif self.snowflake:
                 # Use NoAgentRAG's query method directly
-                return self.snowflake.query(query)
+                response = self.snowflake.query(query)
+                st.session_state.last_trace = getattr(self.snowflake, "last_trace", None)
+                return response
             # else:
             #     # Fallback to regular chat if Snowflake is not available
             #     return self._process_regular_query(query)
@@ -334,7 +349,8 @@ class Chatbot:
         Returns:
             str: Direct response from Mistral AI
         """
-        response = self.mistral_client.chat.complete(
+        response = governed_complete(
+            self.mistral_client,
             model="mistral-large-latest",
             messages=[
                 {"role": "system", "content": DEFAULT_ASSISTANT_PROMPT},
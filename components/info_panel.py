@@ -1,6 +1,9 @@
 import streamlit as st
 import base64
+import plotly.graph_objects as go
 from components.mindmap import MindMap
+from utils.llm_governor import get_governor
+from utils.transcript_store import get_transcript_store
 
 def render_info_panel():
     """Render the information panel component of the application.
@@ -9,12 +12,15 @@ def render_info_panel():
     1. Displays interactive mind maps when generated
     2. Shows PDF document previews when files are selected
     3. Indicates current search mode and selected files
+    4. Shows a timing waterfall of the last RAG request for debugging
     
     The panel includes:
     - Custom styling for buttons and titles
     - Interactive controls for mind map nodes (expand/delete)
     - PDF viewer with error handling
     - Search mode status display
+    - Video selection for questions across several indexed videos
+    - Request trace waterfall with OTLP JSON export
     """
     
     # Add custom styles for info panel title and buttons
@@ -98,7 +104,16 @@ def render_info_panel():
         </div>
         """
         st.markdown(video_embed, unsafe_allow_html=True)
+        # Leave video mode so follow-up questions go back to the knowledge base
+        if st.button("Stop chatting with this video", key="stop_video"):
+            st.session_state.pop('current_video', None)
+            st.session_state.pop('current_video_id', None)
+            st.rerun()
         st.markdown("---")  # Visual separator
+
+    # Cross-video search over every indexed transcript
+    if 'current_video' in st.session_state or st.session_state.get('selected_video_ids'):
+        render_video_selection()
     
     # Mind Map Display Section
     if st.session_state.get('show_mindmap', False) and st.session_state.get('current_mindmap'):
@@ -107,6 +122,12 @@ def render_info_panel():
         # Display mind map visualization and controls
         if mindmap.nodes:  # Only show if there are nodes
             clicked_node = mindmap.visualize()
+            context_stats = getattr(mindmap, "context_stats", None)
+            if context_stats:
+                st.caption(
+                    f"Last edit sent ~{context_stats['prompt_tokens']} prompt tokens "
+                    f"(~{context_stats['tokens_saved']} saved vs. the full conversation)"
+                )
             
             # Show interactive controls when a node is selected
             if clicked_node:
@@ -174,4 +195,76 @@ def render_info_panel():
                 st.markdown(f"- {file}")
     elif search_mode == 'all_files':
         st.markdown("**Searching in all files**")
-    
\ No newline at end of file
+    
+
+    # Request Trace Section
+    trace = st.session_state.get('last_trace')
+    if trace is not None:
+        with st.expander("Last request trace"):
+            render_trace_waterfall(trace)
+            render_llm_queue_metrics()
+
+def render_llm_queue_metrics():
+    """Queue waits of the LLM governor per priority class, across all sessions."""
+    metrics = get_governor().metrics()
+    st.markdown(f"**LLM queue** ({metrics['active']} in flight, {metrics['queued']} waiting)")
+    st.table({
+        priority: {
+            "calls": stats["calls"],
+            "mean wait (s)": round(stats["mean_wait_s"], 2),
+            "p95 wait (s)": round(stats["p95_wait_s"], 2),
+            "max wait (s)": round(stats["max_wait_s"], 2),
+        }
+        for priority, stats in metrics["priorities"].items()
+    })
+
+def render_video_selection():
+    """Let the user pick indexed videos to query together."""
+    videos = get_transcript_store().list_videos()
+    titles = {video["video_id"]: f"{video['title']} ({video['author']})" for video in videos}
+    # Drop selections of videos evicted from the store since the last run
+    if 'selected_video_ids' in st.session_state:
+        st.session_state.selected_video_ids = [v for v in st.session_state.selected_video_ids if v in titles]
+    # With fewer than two videos there is nothing to combine, unless a selection is left to clear
+    if len(videos) < 2 and not st.session_state.get('selected_video_ids'):
+        return
+    st.multiselect(
+        "Search across videos",
+        options=list(titles),
+        format_func=titles.get,
+        key="selected_video_ids",
+        help="Questions are answered from all selected videos, with a citation per video",
+    )
+
+def render_trace_waterfall(trace):
+    """Render the spans of a `utils.tracing.Trace` as a horizontal waterfall."""
+    rows = trace.waterfall()
+    if not rows:
+        st.markdown("No spans recorded")
+        return
+    labels = [f"{'  ' * row['depth']}{row['name']} ({i})" for i, row in enumerate(rows)]
+    hover = [
+        "<br>".join(f"{k}: {v}" for k, v in row["attributes"].items()) + (f"<br>error: {row['error']}" if row["error"] else "")
+        for row in rows
+    ]
+    fig = go.Figure(go.Bar(
+        x=[row["duration_s"] for row in rows],
+        base=[row["start_s"] for row in rows],
+        y=labels,
+        orientation="h",
+        hovertext=hover,
+        marker_color=["#FF4500" if row["error"] else "#00CED1" for row in rows],
+    ))
+    fig.update_layout(
+        height=max(200, 28 * len(rows)),
+        margin=dict(l=0, r=0, t=10, b=0),
+        xaxis_title="seconds",
+        yaxis=dict(autorange="reversed"),
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.download_button(
+        "Download OTLP JSON",
+        data=trace.to_json(),
+        file_name=f"trace-{trace.trace_id}.json",
+        mime="application/json",
+    )
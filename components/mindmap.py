@@ -2,11 +2,12 @@ from __future__ import annotations
 import sys
 from pathlib import Path
 
-from config import MISTRAL_API_KEY
+from config import MISTRAL_API_KEY, MindMapContextConfig
 sys.path.append(str(Path(__file__).parent.parent))
 
 import re
-from typing import Optional, Tuple, List, Union, Literal
+from itertools import islice
+from typing import Dict, FrozenSet, Optional, Tuple, List, Union, Literal
 import base64
 import matplotlib.pyplot as plt
 import streamlit as st
@@ -16,6 +17,7 @@ from mistralai import Mistral
 from dataclasses import dataclass, asdict
 from textwrap import dedent
 from streamlit_agraph import agraph, Node, Edge, Config
+from utils.llm_governor import governed_complete
 from prompts.system_prompts import (
     MINDMAP_SYSTEM_PROMPT,
     MINDMAP_INSTRUCTION_PROMPT,
@@ -52,6 +54,14 @@ START_CONVERSATION = [
 for msg in MINDMAP_EXAMPLE_CONVERSATION:
     START_CONVERSATION.append(Message(msg["content"], role=msg["role"]))
 
+def estimate_tokens(messages: List[Message], chars_per_token: float = 4.0) -> int:
+    """Approximate prompt size of a conversation from its character count."""
+    return int(sum(len(m.content) for m in messages) / chars_per_token)
+
+def serialize_edges(edges: List[Tuple[str, str]]) -> str:
+    """Write edges in the same add(...) syntax the model answers with."""
+    return "\n".join(f'add("{a}", "{b}")' for a, b in edges)
+
 def ask_mistral(conversation: List[Message]) -> Tuple[str, List[Message]]:
     """Send conversation to Mistral AI and get response.
     
@@ -65,7 +75,8 @@ def ask_mistral(conversation: List[Message]) -> Tuple[str, List[Message]]:
             
     Note: Uses mistral-large-latest model for optimal mind map generation
     """
-    response = mistral_client.chat.complete(
+    response = governed_complete(
+        mistral_client,
         model="mistral-large-latest",
         messages=[asdict(c) for c in conversation]
     )
@@ -78,7 +89,10 @@ def ask_mistral(conversation: List[Message]) -> Tuple[str, List[Message]]:
 class MindMap:
     """Represents and manages an interactive mind map visualization.
     
-    The mind map is stored as a graph structure with nodes and edges.
+    The mind map is stored as an undirected graph: an adjacency dict (node -> neighbors,
+    insertion ordered) plus a dict of edges keyed by their endpoint set, so adding or
+    deleting costs O(degree) instead of a pass over the whole map. Nodes exist while
+    they have at least one edge. `nodes` and `edges` are list views in insertion order.
     Supports operations like:
     - Creating new mind maps from text prompts
     - Expanding existing nodes
@@ -93,10 +107,86 @@ class MindMap:
             edges (Optional[List[Tuple[str, str]]]): List of node pairs representing connections
             nodes (Optional[List[str]]): List of node labels/content
         """
-        self.edges = [] if edges is None else edges
-        self.nodes = [] if nodes is None else nodes
+        self._adjacency: Dict[str, Dict[str, None]] = {}
+        self._edges: Dict[FrozenSet[str], Tuple[str, str]] = {}
+        for node in nodes or []:
+            self._adjacency.setdefault(node, {})
+        for a, b in edges or []:
+            self.add_edge(a, b)
+        self.conversation: List[Message] = []
+        self.context_config = MindMapContextConfig()
+        # Prompt size of the last request: sent, with the full history, and saved (estimates)
+        self.context_stats = {}
         self.save()
 
+    @property
+    def nodes(self) -> List[str]:
+        return list(self._adjacency)
+
+    @property
+    def edges(self) -> List[Tuple[str, str]]:
+        return list(self._edges.values())
+
+    def has_edge(self, a: str, b: str) -> bool:
+        return frozenset((a, b)) in self._edges
+
+    def neighbors(self, node: str) -> List[str]:
+        return list(self._adjacency.get(node, ()))
+
+    def neighborhood_edges(self, node: str, hops: int, max_edges: int) -> List[Tuple[str, str]]:
+        """Edges within `hops` of `node`, breadth first, at most `max_edges`."""
+        edges: Dict[FrozenSet[str], Tuple[str, str]] = {}
+        seen = {node}
+        frontier = [node]
+        for _ in range(hops):
+            next_frontier = []
+            for current in frontier:
+                for other in self._adjacency.get(current, ()):
+                    key = frozenset((current, other))
+                    if key not in edges:
+                        if len(edges) >= max_edges:
+                            return list(edges.values())
+                        edges[key] = self._edges[key]
+                    if other not in seen:
+                        seen.add(other)
+                        next_frontier.append(other)
+            frontier = next_frontier
+        return list(edges.values())
+
+    def add_edge(self, a: str, b: str) -> bool:
+        """Connect two nodes, creating them if needed. Returns False for loops and duplicates."""
+        key = frozenset((a, b))
+        if a == b or key in self._edges:
+            return False
+        self._edges[key] = (a, b)
+        self._adjacency.setdefault(a, {})[b] = None
+        self._adjacency.setdefault(b, {})[a] = None
+        return True
+
+    def remove_edge(self, a: str, b: str) -> bool:
+        """Disconnect two nodes in either direction, dropping endpoints left without edges."""
+        if self._edges.pop(frozenset((a, b)), None) is None:
+            return False
+        for node, other in ((a, b), (b, a)):
+            neighbors = self._adjacency[node]
+            neighbors.pop(other, None)
+            if not neighbors:
+                del self._adjacency[node]
+        return True
+
+    def remove_node(self, node: str) -> bool:
+        """Remove a node and its edges in O(degree)."""
+        neighbors = self._adjacency.pop(node, None)
+        if neighbors is None:
+            return False
+        for other in neighbors:
+            del self._edges[frozenset((node, other))]
+            other_neighbors = self._adjacency[other]
+            other_neighbors.pop(node, None)
+            if not other_neighbors:
+                del self._adjacency[other]
+        return True
+
     @classmethod
     def load(cls) -> MindMap:
         """Load existing mind map from session state or create new one.
@@ -118,7 +208,7 @@ class MindMap:
         Returns:
             bool: True if mind map has no edges, False otherwise
         """
-        return len(self.edges) == 0
+        return not self._edges
     
     def ask_for_initial_graph(self, query: str) -> None:
         """Generate a new mind map from scratch based on user query.
@@ -155,18 +245,60 @@ class MindMap:
             return
 
         if selected_node is not None:
-            conversation = self.conversation + [
-                Message(f"""
-                    add new edges to new nodes, starting from the node "{selected_node}"
-                """, role="user")
-            ]
+            request = Message(f"""
+                add new edges to new nodes, starting from the node "{selected_node}"
+            """, role="user")
             st.session_state.last_expanded = selected_node
         else:
-            conversation = self.conversation + [Message(text, role="user")]
+            request = Message(text, role="user")
 
-        output, self.conversation = ask_mistral(conversation)
+        full_history = self.conversation + [request]
+        if self.context_config.mode == "full":
+            conversation = full_history
+        else:
+            conversation = self.bounded_context(request, selected_node)
+        self._record_context_stats(conversation, full_history)
+
+        output, _ = ask_mistral(conversation)
+        # The history is still kept for the "full" mode and to report what bounding saves
+        self.conversation = full_history + [Message(output, role="assistant")]
         self.parse_and_include_edges(output, replace=False)
 
+    def bounded_context(self, request: Message, selected_node: Optional[str] = None) -> List[Message]:
+        """Few-shot prefix plus the current graph instead of the conversation history.
+
+        Expanding a node sends its neighborhood; a free-text instruction sends the map
+        itself. Both are capped at `max_context_edges`, so the prompt does not grow with
+        the number of edits or the size of the map.
+        """
+        config = self.context_config
+        if selected_node is not None:
+            edges = self.neighborhood_edges(selected_node, config.neighborhood_hops, config.max_context_edges)
+            scope = f'the part of the current mind map around "{selected_node}"'
+        else:
+            edges = list(islice(self._edges.values(), config.max_context_edges))
+            scope = "the current mind map"
+        shown = "" if len(edges) == len(self._edges) else f" ({len(edges)} of its {len(self._edges)} edges)"
+        state = Message(
+            f"Ignore the example graph above. This is {scope}{shown}:\n"
+            f"{serialize_edges(edges)}\n\n"
+            f"{request.content}",
+            role="user",
+        )
+        return START_CONVERSATION + [state]
+
+    def _record_context_stats(self, sent: List[Message], full_history: List[Message]) -> None:
+        chars_per_token = self.context_config.chars_per_token
+        sent_tokens = estimate_tokens(sent, chars_per_token)
+        history_tokens = estimate_tokens(full_history, chars_per_token)
+        self.context_stats = {
+            "prompt_tokens": sent_tokens,
+            "full_history_tokens": history_tokens,
+            "tokens_saved": max(0, history_tokens - sent_tokens),
+        }
+        print(f"Mind map context: ~{sent_tokens} prompt tokens "
+              f"(~{self.context_stats['tokens_saved']} saved vs. full history of ~{history_tokens})")
+
     def parse_and_include_edges(self, output: str, replace: bool=True) -> None:
         """Parse Mistral's output and update the graph structure.
         
@@ -177,8 +309,8 @@ class MindMap:
         Process:
         1. Extract add/delete commands using regex
         2. Process node and edge modifications
-        3. Update graph while maintaining consistency
-        4. Remove any duplicate edges
+        3. Apply deletions, then add new edges that are not deleted in the same output
+        4. Skip duplicate edges and self-loops
         """
 
         pattern1 = r'(add|delete)\("([^()"]+)",\s*"([^()"]+)"\)'
@@ -206,19 +338,17 @@ class MindMap:
                 remove_nodes.add(args[0])
 
         if replace:
-            edges = new_edges
-        else:
-            edges = self.edges + new_edges
-
-        added = set()
-        for edge in edges:
-            nodes = frozenset(edge)
-            if nodes in added or nodes & remove_nodes or nodes in remove_edges:
+            self._adjacency = {}
+            self._edges = {}
+        for node in remove_nodes:
+            self.remove_node(node)
+        for edge in remove_edges:
+            self.remove_edge(*edge)
+
+        for a, b in new_edges:
+            if a in remove_nodes or b in remove_nodes or frozenset((a, b)) in remove_edges:
                 continue
-            added.add(nodes)
-
-        self.edges = list([tuple(a) for a in added])
-        self.nodes = list(set([n for e in self.edges for n in e]))
+            self.add_edge(a, b)
         self.save()
 
     def _delete_node(self, node) -> None:
@@ -232,8 +362,7 @@ class MindMap:
         - Updates node list to reflect changes
         - Records deletion in conversation history
         """
-        self.edges = [e for e in self.edges if node not in frozenset(e)]
-        self.nodes = list(set([n for e in self.edges for n in e]))
+        self.remove_node(node)
         self.conversation.append(Message(
             f'delete("{node}")', 
             role="user"
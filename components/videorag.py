@@ -1,23 +1,15 @@
-import sys
-import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple, Optional, Dict, List
 import streamlit as st
 from youtube_transcript_api import YouTubeTranscriptApi
 from mistralai import Mistral
+from config import QuoteAlignmentConfig, VideoStoreConfig
+from utils.llm_governor import governed_complete
+from utils.transcript_alignment import TranscriptAlignment, align_answer, alignment_cache, merge_reports
+from utils.transcript_chunker import chunk_transcript
+from utils.transcript_store import get_transcript_store, hash_transcript
+from utils.youtube_metadata import fetch_transcript_with_metadata, fetch_video_metadata
 
-# Handle SQLite version requirement for ChromaDB
-try:
-    import pysqlite3
-    sys.modules['sqlite3'] = pysqlite3
-except ImportError:
-    pass
-
-from chromadb import Client, Settings
-import chromadb
-import os
-import uuid
-import requests
-import re
 from datetime import datetime, timedelta
 
 class VideoRAG:
@@ -31,26 +23,18 @@ class VideoRAG:
         """
         self.mistral_client = mistral_client
         
-        # Create a unique directory for this instance
-        self.temp_dir = os.path.join(tempfile.gettempdir(), f"chroma_{uuid.uuid4().hex}")
-        os.makedirs(self.temp_dir, exist_ok=True)
+        # Transcripts live in a persistent store shared by every session and rerun
+        self.store = get_transcript_store()
+        self.store_config = VideoStoreConfig()
+        self.alignment_config = QuoteAlignmentConfig()
+        self.collection = self.store.collection
         
-        # Initialize ChromaDB with unique persistence directory
-        self.chroma_client = Client(Settings(
-            persist_directory=self.temp_dir,
-            anonymized_telemetry=False,
-            is_persistent=True
-        ))
-        
-        # Create a unique collection name
-        collection_name = f"youtube_transcripts_{uuid.uuid4().hex[:8]}"
-        self.collection = self.chroma_client.create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        
-        # Store video metadata
+        # Metadata of videos fetched by this instance, until they are indexed
         self.video_metadata = {}
+        # Timing of the last ingest (chunks, embed_s, add_s, chunks_per_s)
+        self.ingest_stats = {}
+        # Quote check of the last answer (verified, corrected, unverified, quotes)
+        self.alignment_report = {}
 
     def extract_video_id(self, video_url: str) -> str:
         """Extract YouTube video ID from URL.
@@ -74,62 +58,29 @@ class VideoRAG:
             raise ValueError("Invalid YouTube URL")
 
     def get_video_metadata(self, video_id: str) -> Dict:
-        """Fetch video metadata using YouTube Data API or oEmbed.
+        """Fetch video metadata using oEmbed and the start of the watch page.
+        
+        Runs in a worker thread next to the transcript download, so it must not touch
+        Streamlit; results are cached per video_id.
         
         Args:
             video_id: YouTube video ID
             
         Returns:
-            Dict containing video title, author, upload date and embed HTML
+            Dict containing video title, author, upload date, url and embed HTML
         """
-        try:
-            # Using oEmbed to get embed HTML and metadata
-            oembed_url = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-            response = requests.get(oembed_url)
-            data = response.json()
-            
-            # Get video page to parse upload date
-            video_url = f"https://www.youtube.com/watch?v={video_id}"
-            video_page = requests.get(video_url)
-            
-            # Try to parse upload date from video page
-            upload_date = datetime.now()  # fallback
-            if video_page.status_code == 200:
-                try:
-                    # Look for uploadDate in the page content
-                    date_match = re.search(r'"uploadDate":"([^"]+)"', video_page.text)
-                    if date_match:
-                        # Parse ISO 8601 format with timezone
-                        iso_date = date_match.group(1)
-                        # Extract just the date part (YYYY-MM-DD) from the ISO timestamp
-                        upload_date = datetime.strptime(iso_date.split('T')[0], "%Y-%m-%d")
-                except Exception as e:
-                    st.warning(f"Could not parse upload date: {e}")
-            
-            # Store video info in session state for info panel
-            st.session_state.current_video = {
-                "id": video_id,
-                "title": data.get("title", "Untitled Video"),
-                "author": data.get("author_name", "Unknown Author"),
-                "embed_html": data.get("html", ""),
-                "url": video_url,
-                "upload_date": upload_date
-            }
-            
-            return {
-                "title": data.get("title", "Untitled Video"),
-                "author": data.get("author_name", "Unknown Author"),
-                "upload_date": upload_date,
-                "url": video_url
-            }
-        except Exception as e:
-            st.error(f"Error fetching video metadata: {e}")
-            return {
-                "title": "Untitled Video",
-                "author": "Unknown Author",
-                "upload_date": datetime.now(),
-                "url": f"https://www.youtube.com/watch?v={video_id}"
-            }
+        return fetch_video_metadata(video_id)
+
+    def show_video(self, video_id: str, metadata: Dict) -> None:
+        """Store video info in session state for info panel."""
+        st.session_state.current_video = {
+            "id": video_id,
+            "title": metadata["title"],
+            "author": metadata["author"],
+            "embed_html": metadata.get("embed_html", ""),
+            "url": metadata["url"],
+            "upload_date": metadata["upload_date"]
+        }
 
     def format_timestamp(self, seconds: float) -> str:
         """Convert seconds to HH:MM:SS format.
@@ -160,63 +111,61 @@ class VideoRAG:
         """
         try:
             video_id = self.extract_video_id(video_url)
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
+            # Metadata is fetched concurrently with the transcript
+            transcript, metadata = fetch_transcript_with_metadata(video_id, YouTubeTranscriptApi.get_transcript)
             
-            # Fetch and store video metadata
-            self.video_metadata[video_id] = self.get_video_metadata(video_id)
+            # Store video metadata
+            self.video_metadata[video_id] = metadata
+            self.show_video(video_id, self.video_metadata[video_id])
             
             return video_id, transcript
         except Exception as e:
             st.error(f"Error fetching transcript: {e}")
             return video_id, []
 
-    def add_video_to_knowledge_base(self, video_url: str) -> bool:
-        """Add video transcript with timestamps to ChromaDB knowledge base."""
+    def show_indexed_video(self, video_id: str) -> None:
+        """Put an already indexed video in the info panel without fetching anything."""
+        metadata = self.store.get_metadata(video_id)
+        if metadata:
+            self.show_video(video_id, metadata)
+
+    def add_video_to_knowledge_base(self, video_url: str, refresh: bool = False) -> bool:
+        """Add video transcript with timestamps to ChromaDB knowledge base.
+
+        Ingest is idempotent: a video that is already indexed is neither re-fetched nor
+        re-embedded unless `refresh` is set, and a refresh only re-embeds when the
+        transcript hash changed.
+        """
         try:
+            video_id = self.extract_video_id(video_url)
+            if not refresh and self.store.has_video(video_id):
+                self.store.touch(video_id)
+                self.show_indexed_video(video_id)
+                return True
+
             video_id, transcript = self.fetch_video_data(video_url)
             if transcript:
-                # Combine transcript entries into meaningful chunks
-                chunks = []
-                current_chunk = {
-                    "text": "",
-                    "start_time": 0,
-                    "duration": 0
-                }
-                
-                for i, entry in enumerate(transcript):
-                    # Start new chunk if current one is too long or ends with period
-                    if (len(current_chunk["text"]) > 0 and 
-                        (len(current_chunk["text"]) + len(entry["text"]) > 200 or 
-                         current_chunk["text"].strip().endswith("."))):
-                        chunks.append(current_chunk)
-                        current_chunk = {
-                            "text": "",
-                            "start_time": entry["start"],
-                            "duration": 0
-                        }
-                    
-                    # Add entry to current chunk
-                    if not current_chunk["text"]:
-                        current_chunk["start_time"] = entry["start"]
-                    current_chunk["text"] += " " + entry["text"]
-                    current_chunk["duration"] = (entry["start"] + entry["duration"]) - current_chunk["start_time"]
-                
-                # Add final chunk if not empty
-                if current_chunk["text"]:
-                    chunks.append(current_chunk)
+                transcript_hash = hash_transcript(transcript)
+                if self.store.get_transcript_hash(video_id) == transcript_hash:
+                    self.store.update_metadata(video_id, self.video_metadata[video_id])
+                    if self.store.get_transcript(video_id) is None:
+                        self.store.put_transcript(video_id, transcript)
+                    return True
+
+                # Combine transcript entries into overlapping, token-bounded windows
+                chunks = chunk_transcript(
+                    transcript,
+                    max_tokens=self.store_config.chunk_max_tokens,
+                    overlap_tokens=self.store_config.chunk_overlap_tokens,
+                    long_video_s=self.store_config.long_video_s,
+                    long_video_scale=self.store_config.long_video_scale,
+                )
                 
-                # Add chunks to ChromaDB
-                for i, chunk in enumerate(chunks):
-                    self.collection.add(
-                        documents=[chunk["text"].strip()],
-                        metadatas=[{
-                            "video_id": video_id,
-                            "start_time": chunk["start_time"],
-                            "duration": chunk["duration"],
-                            "chunk_id": i
-                        }],
-                        ids=[f"{video_id}_chunk_{i}"]
-                    )
+                # Add chunks to the shared store (batched embedding and inserts)
+                self.ingest_stats = self.store.add_video(
+                    video_id, self.video_metadata[video_id], chunks,
+                    transcript_hash=transcript_hash, transcript=transcript,
+                )
                 return True
             return False
         except Exception as e:
@@ -249,43 +198,121 @@ class VideoRAG:
 
     def query_video(self, question: str, video_id: Optional[str] = None) -> str:
         """Query the video knowledge base using Mistral, returning summary and quotes."""
+        return self.query_videos(question, [video_id] if video_id else None)
+
+    def query_videos(self, query: str, video_ids: Optional[List[str]] = None) -> str:
+        """Answer one or more questions over several indexed videos.
+
+        Chunks are ranked across `video_ids` (every indexed video when None) and each
+        quote is cited with the video it came from. A query with one question per line
+        is answered as a batch: all questions are retrieved in a single Chroma query.
+        
+        Args:
+            query: A question, or several questions on separate lines
+            video_ids: Videos to search, None for all indexed videos
+            
+        Returns:
+            Answer text, one section per question for batches
+        """
         try:
+            questions = split_questions(query)
             # Query ChromaDB for relevant chunks
-            where_clause = {"video_id": video_id} if video_id else None
-            results = self.collection.query(
-                query_texts=[question],
+            results = self.store.query(
+                questions,
+                video_ids=video_ids,
                 n_results=5,  # Increased to get more context
-                where=where_clause
             )
+            batches = list(zip(questions, results['documents'], results['metadatas']))
+            if len(batches) == 1:
+                answer, self.alignment_report = self._answer_from_chunks(*batches[0])
+                return answer
             
-            # Get video metadata and format citations
-            metadata = self.video_metadata.get(video_id, {
-                "title": "Untitled Video",
-                "author": "Unknown Author",
-                "upload_date": datetime.now(),
-                "url": f"https://www.youtube.com/watch?v={video_id}"
-            })
-            
-            full_citation, parenthetical = self.format_apa_citation(metadata)
-            
-            # Prepare context with timestamps
-            context_entries = []
-            for doc, meta in zip(results['documents'][0], results['metadatas'][0]):
-                start_time = self.format_timestamp(meta["start_time"])
-                end_time = self.format_timestamp(meta["start_time"] + meta["duration"])
-                context_entries.append(f"[{start_time}-{end_time}] {doc}")
-            
-            context = "\n".join(context_entries)
+            # Each worker returns its own quote report; they are merged here, not on self
+            with ThreadPoolExecutor(max_workers=min(4, len(batches))) as pool:
+                answers, reports = zip(*pool.map(lambda batch: self._answer_from_chunks(*batch), batches))
+            self.alignment_report = merge_reports(reports)
+            return "\n\n".join(
+                f"**Q{i}: {question}**\n\n{answer}"
+                for i, (question, answer) in enumerate(zip(questions, answers), start=1)
+            )
             
-            prompt = f"""Based on the following video transcript excerpt, first provide a 1-2 sentence summary, then list the relevant exact quotes with their timestamps.
+        except Exception as e:
+            st.error(f"Error querying video: {e}")
+            return "Sorry, I encountered an error while processing your question."
+
+    def get_citation_metadata(self, video_id: str) -> Dict:
+        return self.video_metadata.get(video_id) or self.store.get_metadata(video_id) or {
+            "title": "Untitled Video",
+            "author": "Unknown Author",
+            "upload_date": datetime.now(),
+            "url": f"https://www.youtube.com/watch?v={video_id}"
+        }
+
+    def get_alignment(self, video_id: str) -> Optional[TranscriptAlignment]:
+        """Quote alignment index of an indexed video, built once per transcript version."""
+        key = (video_id, self.store.get_transcript_hash(video_id))
+        alignment = alignment_cache.get(key)
+        if alignment is None:
+            transcript = self.store.get_transcript(video_id)
+            if transcript is None:
+                return None
+            alignment = TranscriptAlignment(transcript)
+            alignment_cache.put(key, alignment)
+        return alignment
+
+    def verify_quotes(self, answer: str, video_ids: List[str]) -> Tuple[str, Dict]:
+        """Fix or flag the timestamps of quoted transcript passages, without another LLM call.
+
+        Returns:
+            Tuple of (checked answer, `align_answer` report)
+        """
+        if not self.alignment_config.enabled:
+            return answer, merge_reports([])
+        alignments = [a for a in map(self.get_alignment, video_ids) if a is not None]
+        answer, report = align_answer(
+            answer,
+            alignments,
+            min_score=self.alignment_config.min_score,
+            tolerance_s=self.alignment_config.tolerance_s,
+        )
+        if report["quotes"]:
+            print(f"Quote check: {report['verified']} verified, "
+                  f"{report['corrected']} corrected, {report['unverified']} unverified")
+        return answer, report
+
+    def _answer_from_chunks(self, question: str, documents: List[str], metadatas: List[Dict]) -> Tuple[str, Dict]:
+        """Build the cited prompt for one question and ask Mistral (no Streamlit calls).
+
+        Runs in worker threads for batched questions, so it returns its quote report
+        instead of storing it on the instance.
+        """
+        # Get video metadata and format citations, in order of first appearance
+        citations = {}
+        for meta in metadatas:
+            if meta["video_id"] not in citations:
+                citations[meta["video_id"]] = self.format_apa_citation(self.get_citation_metadata(meta["video_id"]))
+        
+        # Prepare context with timestamps and the video each excerpt comes from
+        context_entries = []
+        for doc, meta in sorted(zip(documents, metadatas), key=lambda item: (item[1]["video_id"], item[1]["start_time"])):
+            start_time = self.format_timestamp(meta["start_time"])
+            end_time = self.format_timestamp(meta["start_time"] + meta["duration"])
+            context_entries.append(f"{citations[meta['video_id']][1]} [{start_time}-{end_time}] {doc}")
+        
+        context = "\n".join(context_entries)
+        video_information = "\n".join(
+            f"- {full_citation} Cite as: {parenthetical}" for full_citation, parenthetical in citations.values()
+        )
+        
+        prompt = f"""Based on the following video transcript excerpts, first provide a 1-2 sentence summary, then list the relevant exact quotes with their timestamps.
 
 Video Information:
-{full_citation}
+{video_information}
 
 Example APA citation format:
 Harvard University. (2019, August 28). Soft robotic gripper for jellyfish [Video]. YouTube. https://www.youtube.com/watch?v=guRoWTYfxMs
 
-Transcript context:
+Transcript context (each excerpt starts with the citation of its video):
 {context}
 
 Question: {question}
@@ -293,7 +320,7 @@ Question: {question}
 Required format:
 First: Brief summary (1-2 sentences)
 Then: Supporting quotes in this format:
-"[Complete sentence or statement from transcript]" [MM:SS-MM:SS] {parenthetical}
+"[Complete sentence or statement from transcript]" [MM:SS-MM:SS] (Author, Year)
 
 IMPORTANT:
 - Start with a concise summary
@@ -303,13 +330,16 @@ IMPORTANT:
 - Present quotes in chronological order
 - Keep quotes verbatim from the transcript
 - Do not truncate sentences
+- Cite every quote with the citation of the video it comes from
+- When several videos are involved, compare what they say
 - Format citations exactly like the example above"""
 
-            # Get response from Mistral with stronger system prompt
-            response = self.mistral_client.chat.complete(
-                model="mistral-large-latest",
-                messages=[
-                    {"role": "system", "content": """You are a precise citation assistant. Your responses must:
+        # Get response from Mistral with stronger system prompt
+        response = governed_complete(
+            self.mistral_client,
+            model="mistral-large-latest",
+            messages=[
+                {"role": "system", "content": """You are a precise citation assistant. Your responses must:
 1. Begin with a 1-2 sentence summary of the answer
 2. Follow with exact quotes from the transcript
 3. Include timestamps for every quote
@@ -317,22 +347,22 @@ IMPORTANT:
 5. Present quotes chronologically
 6. Format each quote on a new line
 7. Never truncate or fragment quotes"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2
-            )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            st.error(f"Error querying video: {e}")
-            return "Sorry, I encountered an error while processing your question."
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2
+        )
+        
+        answer, report = self.verify_quotes(response.choices[0].message.content, list(citations))
+        references = "\n".join(f"- {full_citation}" for full_citation, _ in citations.values())
+        return (f"{answer}\n\nReferences:\n{references}" if references else answer), report
 
-    def process_video_query(self, query: str) -> str:
+    def process_video_query(self, query: str, refresh: bool = False) -> str:
         """Process a query that contains both a YouTube URL and a question.
         
         Args:
-            query (str): Full query containing URL and question
+            query (str): Full query containing URL and question. A `--refresh` token
+                forces the transcript to be fetched again.
+            refresh (bool): Re-fetch the transcript even if the video is indexed
             
         Returns:
             str: Answer based on video content
@@ -345,14 +375,19 @@ IMPORTANT:
             
             # Remove the URL from query to get the actual question
             question = query.replace(video_url, '').strip()
+            if "--refresh" in question.split():
+                refresh = True
+                question = " ".join(word for word in question.split() if word != "--refresh")
             
             # If there's no actual question, return a prompt
             if not question:
                 return "What would you like to know about this video?"
             
             # Process video and get answer
-            if self.add_video_to_knowledge_base(video_url):
+            if self.add_video_to_knowledge_base(video_url, refresh=refresh):
                 video_id = self.extract_video_id(video_url)
+                # Follow-up questions without the URL stay on this video
+                st.session_state.current_video_id = video_id
                 return self.query_video(question, video_id)
             return "Sorry, I couldn't process that video. Please make sure it has closed captions available."
             
@@ -361,19 +396,16 @@ IMPORTANT:
             return "Sorry, I encountered an error while processing your request."
 
     def cleanup(self):
-        """Clean up temporary files and close connections."""
-        try:
-            # Delete the collection
-            if hasattr(self, 'collection'):
-                self.chroma_client.delete_collection(self.collection.name)
-            
-            # Close the client
-            if hasattr(self, 'chroma_client'):
-                del self.chroma_client
-            
-            # Remove the temporary directory
-            if hasattr(self, 'temp_dir') and os.path.exists(self.temp_dir):
-                import shutil
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
-        except Exception as e:
-            st.error(f"Error during cleanup: {e}") 
\ No newline at end of file
+        """Release per-instance state.
+
+        The transcript store is shared and persistent, so nothing is deleted here;
+        old videos are evicted by the store itself.
+        """
+        self.video_metadata.clear()
+
+def split_questions(query: str) -> List[str]:
+    """Split a query with one question per line (each ending in "?") into a batch."""
+    lines = [line.strip() for line in query.splitlines() if line.strip()]
+    if len(lines) > 1 and all(line.endswith("?") for line in lines):
+        return lines
+    return [query.strip()]
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import os
 import streamlit as st
 from dotenv import load_dotenv
@@ -18,6 +18,154 @@ class AppConfig:
     default_chunk_size: int = 4000
     default_chunk_overlap: int = 0
     default_search_limit: int = 7
+
+@dataclass
+class LLMGovernorConfig:
+    # Maximum number of in-flight LLM requests across all sessions
+    max_concurrency: int = 8
+    # provider or "provider:model" -> (requests per second, burst size). A model without
+    # its own entry shares its provider's bucket; providers without one (e.g. "cortex"
+    # evaluation calls) are only bounded by max_concurrency.
+    rate_limits: dict = field(default_factory=lambda: {
+        "mistral": (1.0, 2),
+        # Small-tier calls fan out (per-chunk document extraction), keep them off the large model's budget
+        "mistral:mistral-small-latest": (5.0, 6),
+        "openai": (5.0, 10),
+    })
+    # Give up waiting for a slot after this many seconds (less if the request deadline is closer)
+    max_queue_wait: float = 120.0
+    # HTTP timeout of one completion, cut to what is left of the request deadline
+    request_timeout_s: float = 60.0
+
+@dataclass
+class CacheConfig:
+    # Root directory for all on-disk caches (arXiv metadata, web pages, transcripts)
+    cache_dir: str = os.getenv("LEXIS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "lexis"))
+    arxiv_ttl_s: int = 7 * 24 * 3600
+    # Serve arXiv results from the cache only (stale entries included), e.g. for benchmarks
+    arxiv_offline: bool = os.getenv("LEXIS_ARXIV_OFFLINE", "0") == "1"
+    # Scraped pages are revalidated with ETag / Last-Modified once older than this
+    web_page_ttl_s: int = 6 * 3600
+    web_max_bytes: int = 200 * 1024 * 1024
+    web_search_ttl_s: int = 15 * 60
+
+@dataclass
+class ArxivConfig:
+    # arXiv asks for at most one API request every 3 seconds, across all threads
+    min_request_interval_s: float = 3.0
+    # Connect/read timeout of a single arXiv HTTP request
+    request_timeout_s: float = 10.0
+    # Budget of one keyword search, pacing waits and retries included
+    keyword_timeout_s: float = 20.0
+
+@dataclass
+class CriticLoopConfig:
+    # False runs the legacy writer -> nested critic chat with a fixed number of turns
+    adaptive: bool = os.getenv("LEXIS_ADAPTIVE_CRITIC", "1") == "1"
+    # Writer drafts per request, including the first one (turns of the legacy chat)
+    max_rounds: int = 2
+    # Critic score (0-10) at or above which a draft is accepted as is
+    score_threshold: float = 8.0
+    # Drafts shorter than this are returned without a critique
+    min_answer_chars: int = 400
+    # No new critic round starts after this many seconds
+    max_wall_time_s: float = 45.0
+
+@dataclass
+class DeadlineConfig:
+    # Wall-clock budget for one agent-mode request
+    total_s: float = 45.0
+    # Longest a web or paper search may take
+    search_slice_s: float = 20.0
+    # Time kept back for the writer when waiting on retrieval
+    writer_reserve_s: float = 15.0
+    # The critic only runs with at least this much budget left
+    critic_min_remaining_s: float = 12.0
+
+@dataclass
+class RelevanceGateConfig:
+    # Top Cortex Search score at which uploaded documents are trusted to answer alone
+    skip_external_above: float = 0.8
+    # Below this top score the search is repeated with `expanded_chunks`
+    expand_below: float = 0.45
+    base_chunks: int = 3
+    expanded_chunks: int = 8
+    # Append every decision to CACHE_DIR/relevance_gate.jsonl for offline tuning (opt-in)
+    log_decisions: bool = os.getenv("LEXIS_LOG_RELEVANCE_GATE", "0") == "1"
+    # Log the raw query text; otherwise only a hash and the length of the query are kept
+    log_queries: bool = os.getenv("LEXIS_LOG_RELEVANCE_GATE_QUERIES", "0") == "1"
+    # The log is rotated to relevance_gate.jsonl.1 (one backup) beyond this size
+    log_max_bytes: int = 10 * 1024 * 1024
+
+@dataclass
+class EmbeddingConfig:
+    # "onnx" runs on onnxruntime (CPU), "torch" on sentence-transformers/torch
+    backend: str = os.getenv("LEXIS_EMBEDDING_BACKEND", "onnx")
+    # Video transcripts and the local intent classifier
+    model_name: str = os.getenv("LEXIS_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    # Semantic splitting of uploaded PDFs. Set it to "" to share model_name and load a single
+    # model; that changes the chunk boundaries of newly uploaded documents in the Cortex corpus
+    document_model_name: str = os.getenv("LEXIS_DOCUMENT_EMBEDDING_MODEL", "Snowflake/snowflake-arctic-embed-m")
+    batch_size: int = 64
+
+@dataclass
+class VideoStoreConfig:
+    # Suffixed with the embedding model slug, so changing models starts a new collection
+    collection_name: str = "youtube_transcripts"
+    # Least recently queried videos are evicted beyond either quota
+    max_videos: int = 200
+    # Approximate budget over the estimated size of every video (chunk text plus a fixed
+    # per-chunk overhead, plus its stored transcript). Not the size on disk: Chroma does
+    # not give back the space of deleted chunks, so the directory can grow past it
+    max_estimated_bytes: int = 1024 * 1024 * 1024
+    # Chunks embedded per model call and inserted per collection.add call
+    embed_batch_size: int = 64
+    add_batch_size: int = 512
+    # Transcript windows (tokens ~ words); videos longer than long_video_s use windows long_video_scale times larger
+    chunk_max_tokens: int = 160
+    chunk_overlap_tokens: int = 32
+    long_video_s: float = 3600
+    long_video_scale: int = 2
+
+@dataclass
+class MindMapContextConfig:
+    # "bounded" sends the few-shot prefix plus the current graph, "full" the whole conversation
+    mode: str = os.getenv("LEXIS_MINDMAP_CONTEXT", "bounded")
+    # Expanding a node shows the edges within this many hops of it
+    neighborhood_hops: int = 2
+    # Upper bound on the edges serialized into one request
+    max_context_edges: int = 120
+    # Rough size of a token, for reporting the tokens saved
+    chars_per_token: float = 4.0
+
+@dataclass
+class QuoteAlignmentConfig:
+    # Check quoted timestamps of video answers against the raw transcript
+    enabled: bool = True
+    # Share of a quote's word trigrams that must be found in place to accept it
+    min_score: float = 0.6
+    # Stated start times this close to the actual one are left as they are
+    tolerance_s: float = 3.0
+
+@dataclass
+class YouTubeConfig:
+    # Point at a local stub server to test metadata fetching offline
+    base_url: str = os.getenv("LEXIS_YOUTUBE_BASE_URL", "https://www.youtube.com")
+    request_timeout_s: float = 10.0
+    # Stop streaming the watch page after this much if uploadDate was not found
+    max_watch_page_bytes: int = 2 * 1024 * 1024
+
+@dataclass
+class WebScraperConfig:
+    # "local" fetches and extracts in-process, "apify" runs the apify/beautifulsoup-scraper actor
+    backend: str = os.getenv("LEXIS_SCRAPER_BACKEND", "local")
+    request_timeout_s: float = 15.0
+    per_host_limit: int = 2
+    max_connections: int = 20
+    # DuckDuckGo search request timeout
+    search_timeout_s: float = 10.0
+    # Longest an Apify actor run may take (also how long we wait for it)
+    apify_timeout_s: int = 60
     
 SNOWFLAKE_ACCOUNT = st.secrets["env"]["SNOWFLAKE_ACCOUNT"]
 SNOWFLAKE_USER = st.secrets["env"]["SNOWFLAKE_USER"]
@@ -42,4 +190,32 @@ CONFIG_LIST = [
         "model": "gpt-4o-mini", 
         "api_key": OPENAPI_KEY
     },
-]
\ No newline at end of file
+]
+
+# Cheaper/faster models for auxiliary agent steps
+SMALL_CONFIG_LIST = [
+    {
+        "model": "mistral-small-latest",
+        "api_key": MISTRAL_API_KEY,
+        "api_type": "mistral"
+    },
+    {
+        "model": "gpt-4o-mini", 
+        "api_key": OPENAPI_KEY
+    },
+]
+
+MODEL_TIERS = {
+    "small": SMALL_CONFIG_LIST,
+    "large": CONFIG_LIST,
+}
+
+# LLM call site -> model tier. Unlisted call sites use the large tier.
+MODEL_ROUTES = {
+    "intent_classifier": "small",
+    "paper_search": "small",
+    "document_reading": "small",
+    "document_map": "small",
+    "critic": "small",
+    "writer": "large",
+}
@@ -6,6 +6,8 @@ Your task is to critically review the content provided, ensuring it meets the fo
 3. **Relevance**: The response must focus solely on the user's requested context, avoiding general or tangential information.
 
 Provide your critique in three sentences or fewer, identifying specific areas for improvement. Ask for a revision that strikes a balance between being concise and including sufficient detail to directly address the context. Ensure your feedback is actionable and guides the responder toward producing a precise, high-quality revision.
+
+End with a final line of the form "SCORE: <0-10>" rating how well the response meets these criteria, where 10 means no revision is needed.
 """
 
 CRITIC_DESCRIPTION="An agent that consults on researching information from authoritative and reliable sources."
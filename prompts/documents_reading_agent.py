@@ -12,6 +12,31 @@ Instructions:
 - Do not make assumptions or fallback to other sources of information, including LLM knowledge.
 """
 
+NO_RELEVANT_INFORMATION = "No relevant information."
+
+CHUNK_EXTRACTION_PROMPT = """
+User's: '{message}'
+Document chunk (source: {source}):
+{chunk}
+
+- Extract only information from this chunk that can be used to answer user's message
+- Ensure the extracted information is complete, accurate and standalone
+- Do not hallucinate
+- Do not answer user's message, respond with the extracted information only
+- If the chunk contains nothing relevant, respond exactly: "No relevant information."
+"""
+
+EXTRACTION_MERGE_PROMPT = """
+User's: '{message}'
+Information extracted from the retrieved documents, one block per source chunk:
+{extractions}
+
+- Merge the blocks into one extraction that can be used to answer user's message, keeping the source file name of every piece of information
+- Remove duplicated information
+- Do not hallucinate
+- Do not answer user's message, respond with the merged information only
+"""
+
 DOCUMENTS_READING_SYSTEM_DESCRIPTION = "An agent that retrieve relevant information to user's message using *semanic search* on the documents."
 # DOCUMENTS_READING_SYSTEM_DESCRIPTION = """
 # An advanced research agent designed to retrieve, analyze, and synthesize information from the uploaded documents in the database. 
@@ -0,0 +1,47 @@
+INTENT_LABELS = ("uploaded_document_read", "papers_search", "web_search", "general")
+
+INTENT_SYSTEM_MESSAGE = """
+Your role is to classify user intents into one of these categories:
+- uploaded_document_read: queries requiring retrieved user's uploaded documents to answer questions
+- papers_search: quieries requiring searching for papers on axvir or web
+- web_search: queries requiring real-time online search on the web
+- general: General queries that don't fit the above categories
+
+Respond with the category name only.
+"""
+
+# Labeled examples for the local intent classifier (keep them out of test_questions.csv)
+INTENT_EXAMPLES = [
+    ("According to the uploaded report, what was the hospital's patient readmission rate?", "uploaded_document_read"),
+    ("Summarize the main findings of the document I uploaded", "uploaded_document_read"),
+    ("What does the contract I attached say about early termination?", "uploaded_document_read"),
+    ("Based on the PDF, how many units did the factory ship in the second quarter?", "uploaded_document_read"),
+    ("Which teaching methods does the handbook recommend for primary school reading?", "uploaded_document_read"),
+    ("What sample size did the clinical study in my file use?", "uploaded_document_read"),
+    ("List the safety requirements mentioned in the uploaded building code", "uploaded_document_read"),
+    ("How does the thesis describe the soil erosion measurements?", "uploaded_document_read"),
+    ("Find papers on coral reef bleaching and ocean temperature", "papers_search"),
+    ("Are there any arxiv articles about quantum error correction codes?", "papers_search"),
+    ("Search for publications on graph neural networks in chemistry", "papers_search"),
+    ("Give me a survey paper on reinforcement learning for robotics", "papers_search"),
+    ("Which preprints study dark matter detection with neutrino telescopes?", "papers_search"),
+    ("Recommend research articles about federated learning privacy", "papers_search"),
+    ("Look up the original paper that introduced batch normalization", "papers_search"),
+    ("What academic work exists on speech recognition for tonal languages?", "papers_search"),
+    ("What is the weather in Hanoi today?", "web_search"),
+    ("Who won the football match last night?", "web_search"),
+    ("What are the latest news about the Fed interest rate decision?", "web_search"),
+    ("When does the next SpaceX launch take place?", "web_search"),
+    ("What is the new iPhone released this month?", "web_search"),
+    ("Which movies are showing in cinemas this weekend?", "web_search"),
+    ("What time does the Louvre open tomorrow?", "web_search"),
+    ("How long is the current wait at the Canadian passport office?", "web_search"),
+    ("Hi, how are you?", "general"),
+    ("Can you help me write a polite email to my professor?", "general"),
+    ("Thanks, that was helpful!", "general"),
+    ("Translate 'good morning' into French", "general"),
+    ("What can you do?", "general"),
+    ("Explain what a p-value is in simple terms", "general"),
+    ("Write a short poem about research", "general"),
+    ("How do I reverse a list in Python?", "general"),
+]
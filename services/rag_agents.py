@@ -1,27 +1,101 @@
 from snowflake.core import Root
 import pandas as pd
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from typing import List, Dict, Any
-from assistance.critics_agent import CriticAgent, reflection_message
+from assistance.critics_agent import CriticAgent, build_reflection_prompt, parse_critic_score, reflection_message
 from assistance.documents_reading_agent import DocumentReadingAgent
 from assistance.intent_classifier_agent import IntentClassifier
 from assistance.paper_search_agent import PaperSearchAgent
 from assistance.user_proxy import UserProxy
 from assistance.web_search_agent import WebSearchAgent
 from assistance.writer_agent import WriterAgent, create_prompt
-from config import SNOWFLAKE_ACCOUNT, SNOWFLAKE_DATABASE, SNOWFLAKE_PASSWORD, SNOWFLAKE_SCHEMA, SNOWFLAKE_USER, SNOWFLAKE_WAREHOUSE, SnowflakeConfig
+from config import SNOWFLAKE_ACCOUNT, SNOWFLAKE_DATABASE, SNOWFLAKE_PASSWORD, SNOWFLAKE_SCHEMA, SNOWFLAKE_USER, SNOWFLAKE_WAREHOUSE, CriticLoopConfig, DeadlineConfig, RelevanceGateConfig, SnowflakeConfig
 from snowflake.snowpark import Session
 import os
 from dotenv import load_dotenv
 
+from utils.agent_pool import AgentPool
 from utils.agents_utils import generate_request_to_recipient
+from utils.deadline import Deadline, degraded_answer, skipped_sources_note, use_deadline
+from utils.model_router import reply_text, step_latencies
+from utils.relevance_gate import EXPAND, GateDecision, get_relevance_gate
+from utils.text_compression import shared_compressor
+from utils import tracing
 from trulens.apps.custom import instrument
 from trulens.core.guardrails.base import context_filter
 
 from utils.trulens_feedback import get_f_guardrail
 
+@dataclass
+class WriterTeam:
+    """User proxy, critic and writer with the critic reflection already registered."""
+    user_proxy: UserProxy
+    critic_agent: CriticAgent
+    writer_agent: WriterAgent
+
+def build_writer_team() -> WriterTeam:
+    user_proxy = UserProxy()
+    critic_agent = CriticAgent()
+    writer_agent = WriterAgent()
+    
+    user_proxy.register_nested_chats(
+        chat_queue= [
+            {
+                "recipient": critic_agent, 
+                "clear_history": True,
+                "message": reflection_message,
+                "summary_method": "last_msg", 
+                "max_turns": 1
+            }
+            ],
+        trigger=writer_agent
+    )
+    return WriterTeam(user_proxy=user_proxy, critic_agent=critic_agent, writer_agent=writer_agent)
+
+# Process-wide pool so agent construction stays off the request path
+agent_pool = AgentPool({
+    "intent_classifier": IntentClassifier,
+    "paper_search": PaperSearchAgent,
+    "web_search": WebSearchAgent,
+    "document_reading": DocumentReadingAgent,
+    "writer_team": build_writer_team,
+})
+
+# Shared by all sessions for the parallel branches of AgentRAG.retrieve
+retrieval_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-retrieval")
+
 class AgentRAG:
-    def __init__(self, config: SnowflakeConfig):
+    def __init__(
+        self,
+        config: SnowflakeConfig,
+        fanout: bool = True,
+        speculative_search: bool = False,
+        critic_loop: CriticLoopConfig = None,
+        deadlines: DeadlineConfig = None,
+        relevance_gate: RelevanceGateConfig = None,
+    ):
+        """
+        Args:
+            config (SnowflakeConfig): Snowflake connection and search service settings
+            fanout (bool): Run document retrieval in parallel with intent classification
+            speculative_search (bool): Also start paper and web search before the intent
+                is known, discarding whichever branch the intent rules out
+            critic_loop (CriticLoopConfig): Writer/critic loop settings, defaults to CriticLoopConfig()
+            deadlines (DeadlineConfig): Per-request time budget, defaults to DeadlineConfig()
+            relevance_gate (RelevanceGateConfig): Cortex score thresholds for skipping external
+                search and widening retrieval, defaults to RelevanceGateConfig()
+        """
+        self.fanout = fanout
+        self.speculative_search = speculative_search
+        self.critic_loop = critic_loop or CriticLoopConfig()
+        self.deadlines = deadlines or DeadlineConfig()
+        self.relevance_gate = get_relevance_gate(relevance_gate)
+        self.critic_stats = {}
+        self.last_trace = None
+        self.skipped_sources = []
         try:
             # Store config first before any other operations
             self.config = config
@@ -58,6 +132,10 @@ class AgentRAG:
             
             print(f"Successfully initialized SnowflakeConnector with search service: {self.config.search_service}")
             
+            # Pre-build agents and load LLMLingua in the background (no-op after the first AgentRAG)
+            shared_compressor.start_loading()
+            agent_pool.warm()
+            
         except Exception as e:
             if hasattr(self, 'config'):
                 detailed_error = f"Snowflake initialization failed:\n" \
@@ -86,81 +164,306 @@ class AgentRAG:
         
         return response.results
     
-    # new
-    @instrument
-    def retrieve(self, query: str) -> list:
-        """
-        Retrieve relevant text from vector store.
-        """
-        #intent classification
-        intent_agent = IntentClassifier()
-        paper_search_agent=PaperSearchAgent()
-        web_search_agent = WebSearchAgent()
-        document_reading_agent = DocumentReadingAgent()
-        intent = intent_agent.classify(query)
-        #print(intent)
-        
-        if 'papers_search' in intent:
+    def classify_intent(self, query: str) -> str:
+        with tracing.span("intent"), agent_pool.acquire("intent_classifier") as intent_agent:
+            intent = intent_agent.classify(query)
+            tracing.set_attributes(intent=intent)
+            return intent
+
+    def search_papers(self, query: str) -> str:
+        with tracing.span("paper_search", span_type="retrieval"), agent_pool.acquire("paper_search") as paper_search_agent:
             search_res = paper_search_agent.search_paper(query=query)
-            if not search_res or (search_res == "" or "no info" in search_res):
-                search_res = ""
-        elif 'web_search' in intent:
-            # always use tools to search
+        if not search_res or (search_res == "" or "no info" in search_res):
+            search_res = ""
+        return search_res
+
+    def search_web(self, query: str) -> str:
+        # always use tools to search
+        with tracing.span("web_search", span_type="retrieval"), agent_pool.acquire("web_search") as web_search_agent:
             search_res = web_search_agent.search_web(query=query)
-            if not search_res or (search_res == "" or "no info" in search_res):
-                search_res = ""
-        else:
+        if not search_res or (search_res == "" or "no info" in search_res):
             search_res = ""
-        #print(f"search_res: {search_res}")
-        
-        # For all intents that require reading a document from the RAG 
-        relev_doc = self.get_similar_chunks_search_service(query=query)
-        relevant_chunks = document_reading_agent.get_relevant_information(message=query, retrieve_relevant_documents=relev_doc)
+        return search_res
+
+    def search_documents(self, query: str):
+        """Cortex search with relevance gating.
+
+        Returns:
+            Tuple[list, GateDecision]: Retrieved chunks and the gate decision; weak
+            matches are retried once with more chunks
+        """
+        gate_config = self.relevance_gate.config
+        with tracing.span("cortex_search", span_type="retrieval"):
+            relev_doc = self.get_similar_chunks_search_service(query=query, num_chunks=gate_config.base_chunks)
+            decision = self.relevance_gate.decide(relev_doc, gate_config.base_chunks)
+            if decision.action == EXPAND:
+                relev_doc = self.get_similar_chunks_search_service(query=query, num_chunks=gate_config.expanded_chunks)
+                decision = GateDecision(EXPAND, decision.top_score, gate_config.expanded_chunks)
+            tracing.set_attributes(chunks=len(relev_doc), gate=decision.action, top_score=decision.top_score or 0.0)
+        return relev_doc, decision
+
+    def read_documents(self, query: str, relev_doc: list = None) -> str:
+        if relev_doc is None:
+            relev_doc, _ = self.search_documents(query)
+        with tracing.span("document_reading", span_type="retrieval"), agent_pool.acquire("document_reading") as document_reading_agent:
+            relevant_chunks = document_reading_agent.get_relevant_information(message=query, retrieve_relevant_documents=relev_doc)
         if not relevant_chunks or (relevant_chunks == "" or "no info" in relevant_chunks):
             relevant_chunks = ""
-        #print(f"relev_doc: {relevant_chunks}")
+        return relevant_chunks
+
+    def external_search_for(self, intent: str):
+        """Return the external search branch required by an intent, if any."""
+        if intent == "papers_search":
+            return self.search_papers
+        elif intent == "web_search":
+            return self.search_web
+        return None
+
+    # new
+    @instrument
+    def retrieve(self, query: str, deadline: Deadline = None) -> list:
+        """
+        Retrieve relevant text from vector store.
+
+        Branches that miss their slice of `deadline` are dropped and recorded in
+        `deadline.skipped`; retrieval returns whatever context arrived in time. The
+        deadline is also handed to the branches (`use_deadline`), which bound their own
+        HTTP, actor and LLM calls by it so late branches release their workers.
+        """
+        deadline = deadline or Deadline(self.deadlines.total_s)
+        with use_deadline(deadline), tracing.span("retrieve", span_type="retrieval", fanout=self.fanout):
+            if self.fanout:
+                search_res, relevant_chunks = self._retrieve_fanout(query, deadline)
+            else:
+                search_res, relevant_chunks = self._retrieve_sequential(query, deadline)
+            tracing.set_attributes(skipped=", ".join(deadline.skipped))
 
         context = f"""       
         {search_res} \n
         {relevant_chunks} \n
         """
         return context.strip()
+
+    def _retrieval_slice(self, deadline: Deadline, optional: bool) -> float:
+        max_s = self.deadlines.search_slice_s if optional else None
+        return deadline.slice(max_s=max_s, reserve_s=self.deadlines.writer_reserve_s)
+
+    def _search_source(self, search) -> str:
+        return "paper search" if search == self.search_papers else "web search"
+
+    def _gate_search(self, query: str, intent: str, search, decision: GateDecision):
+        """Drop the external search when the uploaded documents already match the query well."""
+        skip = search is not None and decision is not None and decision.skip_external
+        if decision is not None:
+            self.relevance_gate.log(
+                query, decision, intent=intent,
+                external_search=None if search is None else self._search_source(search),
+                external_skipped=skip,
+            )
+        return None if skip else search
+
+    def _retrieve_sequential(self, query: str, deadline: Deadline):
+        #intent classification
+        intent = deadline.wait(
+            tracing.submit_in_context(retrieval_executor, self.classify_intent, query),
+            "intent classification", self._retrieval_slice(deadline, optional=True), default="general",
+        )
+        relev_doc, decision = deadline.wait(
+            tracing.submit_in_context(retrieval_executor, self.search_documents, query),
+            "uploaded documents", self._retrieval_slice(deadline, optional=False), default=([], None),
+        )
+        search = self._gate_search(query, intent, self.external_search_for(intent), decision)
+        search_res = ""
+        if search:
+            search_res = deadline.wait(
+                tracing.submit_in_context(retrieval_executor, search, query),
+                self._search_source(search), self._retrieval_slice(deadline, optional=True),
+            )
+        
+        # For all intents that require reading a document from the RAG 
+        relevant_chunks = ""
+        if relev_doc:
+            relevant_chunks = deadline.wait(
+                tracing.submit_in_context(retrieval_executor, self.read_documents, query, relev_doc),
+                "uploaded documents", self._retrieval_slice(deadline, optional=False),
+            )
+        return search_res, relevant_chunks
+
+    def _retrieve_fanout(self, query: str, deadline: Deadline):
+        """Run the retrieval branches in parallel.
+
+        Cortex search does not depend on the intent, so it starts together with intent
+        classification, and document reading starts as soon as the chunks arrive. With
+        `speculative_search`, paper and web search start too; branches ruled out by the
+        intent or by the relevance gate are cancelled if they are still queued and
+        ignored otherwise. Critical-path latency is the slowest required branch instead
+        of the sum of all of them, and each branch is bounded by its slice of `deadline`.
+        """
+        cortex = tracing.submit_in_context(retrieval_executor, self.search_documents, query)
+        intent_future = tracing.submit_in_context(retrieval_executor, self.classify_intent, query)
+        speculative = {}
+        if self.speculative_search:
+            speculative = {
+                self.search_papers: tracing.submit_in_context(retrieval_executor, self.search_papers, query),
+                self.search_web: tracing.submit_in_context(retrieval_executor, self.search_web, query),
+            }
+
+        relev_doc, decision = deadline.wait(
+            cortex, "uploaded documents", self._retrieval_slice(deadline, optional=False), default=([], None),
+        )
+        documents = tracing.submit_in_context(retrieval_executor, self.read_documents, query, relev_doc) if relev_doc else None
+
+        intent = deadline.wait(
+            intent_future, "intent classification", self._retrieval_slice(deadline, optional=True), default="general",
+        )
+        search = self._gate_search(query, intent, self.external_search_for(intent), decision)
+        for branch, future in speculative.items():
+            if branch != search:
+                future.cancel()
+
+        search_res = ""
+        if search is not None:
+            search_future = speculative.get(search) or tracing.submit_in_context(retrieval_executor, search, query)
+            search_res = deadline.wait(
+                search_future, self._search_source(search), self._retrieval_slice(deadline, optional=True),
+            )
+        relevant_chunks = ""
+        if documents is not None:
+            relevant_chunks = deadline.wait(
+                documents, "uploaded documents", self._retrieval_slice(deadline, optional=False),
+            )
+        return search_res, relevant_chunks
         
     # new generate function using agents
     @instrument
-    def generate_completion(self, query: str, context_str: list) -> str:
-        user_proxy = UserProxy()
-        critic_agent = CriticAgent()
-        writer_agent = WriterAgent()
+    def generate_completion(self, query: str, context_str: list, deadline: Deadline = None) -> str:
+        deadline = deadline or Deadline(self.deadlines.total_s)
+        note = skipped_sources_note(deadline.skipped)
+        aggregate_prompt = create_prompt(context=f"{context_str}\n{note}" if note else context_str, message=query)
+        shared_compressor.begin_request()
+        with use_deadline(deadline), tracing.span("generate", span_type="generation"), agent_pool.acquire("writer_team") as team:
+            if self.critic_loop.adaptive:
+                completion = self._write_with_critic(team, aggregate_prompt, context_str, deadline)
+            else:
+                with tracing.span("writer", span_type="generation", nested_critic=True), use_deadline(self._writer_deadline(deadline)):
+                    chat_queue = []
+                    chat_queue.append(generate_request_to_recipient(agent=team.writer_agent,message=aggregate_prompt, max_turns=self.critic_loop.max_rounds))
+                    try:
+                        res = team.user_proxy.initiate_chats(chat_queue=chat_queue)
+                        completion = res[-1].chat_history[-1]['content']
+                    except Exception as e:
+                        print(f"Writer failed, returning the retrieved context: {e}")
+                        completion = degraded_answer(context_str, deadline.skipped)
+        self.compression_stats = shared_compressor.request_stats()
+        print(f"Context compression: {self.compression_stats}")
+        return completion
+
+    def _writer_deadline(self, deadline: Deadline) -> Deadline:
+        """Deadline of the first draft, which always gets at least `writer_reserve_s`."""
+        return deadline.guarantee(self.deadlines.writer_reserve_s)
+
+    def _write_with_critic(self, team: WriterTeam, aggregate_prompt: str, context_str: str, deadline: Deadline) -> str:
+        """Draft, then revise only while the critic scores the draft below the threshold.
+
+        The critic is skipped for short drafts and when there is no retrieved context
+        (general-knowledge answers), and no new round starts once the wall-time cap is
+        reached or too little of the request deadline is left. Each writer and critic
+        call is itself bounded by the deadline (see `govern_agent`), except that the
+        first draft always gets `writer_reserve_s` however long retrieval took. A first
+        draft that still fails returns the retrieved context instead; a critique or
+        revision that fails or times out keeps the current draft. Per-request stats
+        land in `self.critic_stats`.
+        """
+        loop = self.critic_loop
+        start = time.perf_counter()
+        messages = [{"role": "user", "content": aggregate_prompt}]
+        stats = {"writer_calls": 1, "critic_calls": 0, "scores": [], "stop_reason": "max_rounds"}
+        with tracing.span("writer", span_type="generation", turn=1), use_deadline(self._writer_deadline(deadline)):
+            try:
+                draft = reply_text(team.writer_agent.generate_reply(messages=messages))
+            except Exception as e:
+                print(f"Writer failed, returning the retrieved context: {e}")
+                stats["stop_reason"] = "writer_failed"
+                stats["seconds"] = time.perf_counter() - start
+                self.critic_stats = stats
+                return degraded_answer(context_str, deadline.skipped)
+
+        while stats["writer_calls"] < loop.max_rounds:
+            if len(draft) < loop.min_answer_chars or not context_str.strip():
+                stats["stop_reason"] = "low_risk"
+                break
+            if time.perf_counter() - start >= loop.max_wall_time_s:
+                stats["stop_reason"] = "time_cap"
+                break
+            if deadline.remaining() < self.deadlines.critic_min_remaining_s:
+                stats["stop_reason"] = "deadline"
+                deadline.skip("critic review")
+                break
+
+            with tracing.span("critic", span_type="generation", turn=stats["critic_calls"] + 1):
+                try:
+                    critique = reply_text(team.critic_agent.generate_reply(messages=[{
+                        "role": "user",
+                        "content": build_reflection_prompt(response=draft, user_message=aggregate_prompt),
+                    }]))
+                except Exception as e:
+                    print(f"Critic failed, keeping the draft: {e}")
+                    stats["stop_reason"] = "critic_failed"
+                    deadline.skip("critic review")
+                    break
+                score = parse_critic_score(critique)
+                tracing.set_attributes(score=score if score is not None else -1.0)
+            stats["critic_calls"] += 1
+            stats["scores"].append(score)
+            if score is not None and score >= loop.score_threshold:
+                stats["stop_reason"] = "accepted"
+                break
+
+            messages += [{"role": "assistant", "content": draft}, {"role": "user", "content": critique}]
+            with tracing.span("writer", span_type="generation", turn=stats["writer_calls"] + 1):
+                try:
+                    revision = reply_text(team.writer_agent.generate_reply(messages=messages))
+                except Exception as e:
+                    print(f"Revision failed, keeping the previous draft: {e}")
+                    stats["stop_reason"] = "revision_failed"
+                    break
+            stats["writer_calls"] += 1
+            draft = revision or draft
+
+        stats["seconds"] = time.perf_counter() - start
+        stats["estimated_seconds_saved"] = self._estimate_critic_savings(stats, loop.max_rounds)
+        self.critic_stats = stats
+        print(f"Critic loop: {stats}")
+        return draft
+
+    @staticmethod
+    def _estimate_critic_savings(stats: dict, max_rounds: int) -> float:
+        """Seconds saved against the legacy path, from mean step latencies.
+
+        The legacy path always runs `max_rounds` writer turns with a critique between
+        two turns, which the adaptive loop never exceeds.
+        """
+        latencies = step_latencies.summary()
+        mean = lambda step: latencies.get(step, {}).get("mean_s", 0.0)
+        writer_saved = max(0, max_rounds - stats["writer_calls"])
+        critic_saved = max(0, max_rounds - 1 - stats["critic_calls"])
+        return writer_saved * mean("writer") + critic_saved * mean("critic")
         
-        user_proxy.register_nested_chats(
-            chat_queue= [
-                {
-                    "recipient": critic_agent, 
-                    "clear_history": True,
-                    "message": reflection_message,
-                    "summary_method": "last_msg", 
-                    "max_turns": 1
-                }
-                ],
-            trigger=writer_agent
-        )
-        aggregate_prompt = create_prompt(context=context_str, message=query)
-        chat_queue = []
-        chat_queue.append(generate_request_to_recipient(agent=writer_agent,message=aggregate_prompt, max_turns=2))
-        res = user_proxy.initiate_chats(chat_queue=chat_queue)
-        return res[-1].chat_history[-1]['content']
-    
     # new
     @instrument 
     def query(self, query: str) -> str:
-        context_str = self.retrieve(query)
-        completion = self.generate_completion(query, context_str)
+        deadline = Deadline(self.deadlines.total_s)
+        with tracing.start_trace("AgentRAG.query", budget_s=deadline.budget_s) as trace:
+            self.last_trace = trace
+            context_str = self.retrieve(query, deadline=deadline)
+            completion = self.generate_completion(query, context_str, deadline=deadline)
+            tracing.set_attributes(skipped=", ".join(deadline.skipped))
+        self.skipped_sources = list(deadline.skipped)
         return completion
  
 class FilteredAgentRAG(AgentRAG):
-    def __init__(self, config: SnowflakeConfig):
-        super().__init__(config)
+    def __init__(self, config: SnowflakeConfig, **kwargs):
+        super().__init__(config, **kwargs)
         
     @context_filter(get_f_guardrail(), 0.5, keyword_for_prompt="query")
     def get_similar_chunks_search_service(
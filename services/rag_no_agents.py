@@ -10,6 +10,8 @@ from prompts.system_prompts import DEFAULT_ASSISTANT_PROMPT
 from services.rag_agents import get_snowpark_session
 from trulens.apps.custom import instrument
 from mistralai import Mistral
+from utils.llm_governor import governed_complete
+from utils import tracing
 
 class NoAgentRAG:
     def __init__(self, config: SnowflakeConfig):
@@ -21,6 +23,7 @@ class NoAgentRAG:
                 self.mistral_client = None
                 return
             self.mistral_client = Mistral(api_key=api_key)
+            self.last_trace = None
             # Store config first before any other operations
             self.config = config
             
@@ -110,20 +113,25 @@ class NoAgentRAG:
     
     @instrument
     def retrieve(self, query:str) -> str:
-        return self.get_similar_chunks_search_service(query)
+        with tracing.span("cortex_search", span_type="retrieval"):
+            chunks = self.get_similar_chunks_search_service(query)
+            tracing.set_attributes(chunks=len(chunks))
+            return chunks
     
     @instrument
     def generate_completion(self, query:str, context_str: list) -> str:
         # Get RAG context and prompt
         prompt, source_paths = self.create_prompt(query, context_str)
         # Use Mistral with RAG context
-        response = self.mistral_client.chat.complete(
-            model="mistral-large-latest",
-            messages=[
-                {"role": "system", "content": DEFAULT_ASSISTANT_PROMPT},
-                {"role": "user", "content": prompt}
-            ]
-        )
+        with tracing.span("writer", span_type="generation", model="mistral-large-latest"):
+            response = governed_complete(
+                self.mistral_client,
+                model="mistral-large-latest",
+                messages=[
+                    {"role": "system", "content": DEFAULT_ASSISTANT_PROMPT},
+                    {"role": "user", "content": prompt}
+                ]
+            )
         
         # Add source attribution if sources were found
         answer = response.choices[0].message.content
@@ -134,6 +142,8 @@ class NoAgentRAG:
     
     @instrument
     def query(self, query: str) -> str:
-        context_str = self.retrieve(query)
-        completion = self.generate_completion(query, context_str)
+        with tracing.start_trace("NoAgentRAG.query") as trace:
+            self.last_trace = trace
+            context_str = self.retrieve(query)
+            completion = self.generate_completion(query, context_str)
         return completion
\ No newline at end of file
@@ -0,0 +1,97 @@
+"""Tests for the in-process page fetcher and extractor against a local fixture server.
+
+Importing `utils.web_cache` reads `config`, so these need the Streamlit secrets like the
+rest of the app.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from utils.web_cache import WebCache
+from utils.web_extractor import PageFetcher, extract_page
+
+FIXTURE = (Path(__file__).parent / "fixtures" / "article.html").read_bytes()
+ETAG = '"article-v1"'
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append((self.path, self.headers.get("If-None-Match")))
+        if self.path != "/article":
+            self.send_error(404)
+            return
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(FIXTURE)))
+        self.send_header("ETag", ETAG)
+        self.end_headers()
+        self.wfile.write(FIXTURE)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def server():
+    FixtureHandler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def fetcher():
+    fetcher = PageFetcher(request_timeout_s=5.0)
+    yield fetcher
+    fetcher.close()
+
+def test_extract_page():
+    page = extract_page(FIXTURE.decode(), "http://example.com/article")
+
+    assert page["url"] == "http://example.com/article"
+    assert page["title"] == "Retrieval-Augmented Generation"
+    content = page["content"]
+    assert content["headers"] == [
+        {"level": "h1", "text": "Retrieval-Augmented Generation"},
+        {"level": "h2", "text": "Components"},
+    ]
+    # Short snippets and the <nav> outside #content are left out
+    assert content["paragraphs"] == [
+        "Retrieval-augmented generation grounds a language model in retrieved documents.",
+    ]
+    assert content["lists"] == [{"type": "ul", "context": "Components", "items": ["Retriever", "Generator"]}]
+    assert content["tables"] == [[["Model", "Year"], ["RAG", "2020"]]]
+
+def test_extract_page_without_title():
+    page = extract_page("<html><head><title></title></head><body></body></html>", "http://example.com")
+    assert page["title"] is None
+
+def test_fetch_skips_failed_pages(server, fetcher):
+    pages = fetcher.fetch([f"{server}/article", f"{server}/missing", f"{server}/article"])
+
+    assert [page["url"] for page in pages] == [f"{server}/article", f"{server}/article"]
+    assert pages[0]["title"] == "Retrieval-Augmented Generation"
+    assert len(FixtureHandler.requests) == 3
+
+def test_fetch_revalidates_stale_pages(server, tmp_path):
+    cache = WebCache(str(tmp_path / "web_cache.sqlite"), page_ttl_s=0, search_ttl_s=0, max_bytes=1 << 20)
+    fetcher = PageFetcher(request_timeout_s=5.0, cache=cache)
+    url = f"{server}/article"
+    try:
+        [(first, first_cached)] = fetcher.fetch_with_cache_status([url])
+        [(second, second_cached)] = fetcher.fetch_with_cache_status([url])
+    finally:
+        fetcher.close()
+
+    assert not first_cached
+    assert second_cached
+    assert second == first
+    assert FixtureHandler.requests == [("/article", None), ("/article", ETAG)]
@@ -0,0 +1,103 @@
+"""Tests for YouTube metadata fetching against a local stub server.
+
+Importing `utils.youtube_metadata` reads `config`, so these need the Streamlit secrets
+like the rest of the app.
+"""
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from config import YouTubeConfig
+from utils.youtube_metadata import fetch_transcript_with_metadata, fetch_video_metadata, metadata_cache
+
+TRANSCRIPT = [{"text": "hello", "start": 0.0, "duration": 1.5}]
+
+class StubYouTubeHandler(BaseHTTPRequestHandler):
+    requests = []
+    delay_s = 0.0
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        type(self).requests.append(url.path)
+        time.sleep(type(self).delay_s)
+        if url.path == "/oembed":
+            video_url = parse_qs(url.query)["url"][0]
+            body = json.dumps({
+                "title": f"Stub video {video_url[-3:]}",
+                "author_name": "Stub Author",
+                "html": "<iframe></iframe>",
+            }).encode()
+            content_type = "application/json"
+        elif url.path == "/watch":
+            body = b'<html><script>{"uploadDate":"2021-05-04T10:00:00-07:00"}</script></html>'
+            content_type = "text/html"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def config():
+    StubYouTubeHandler.requests = []
+    StubYouTubeHandler.delay_s = 0.0
+    metadata_cache.pop("abc")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubYouTubeHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield YouTubeConfig(base_url=f"http://127.0.0.1:{httpd.server_address[1]}", request_timeout_s=2.0)
+    httpd.shutdown()
+    httpd.server_close()
+    metadata_cache.pop("abc")
+
+def test_fetch_video_metadata(config):
+    metadata = fetch_video_metadata("abc", config)
+
+    assert metadata["title"] == "Stub video abc"
+    assert metadata["author"] == "Stub Author"
+    assert metadata["embed_html"] == "<iframe></iframe>"
+    assert metadata["upload_date"] == datetime(2021, 5, 4)
+    assert metadata["url"] == "https://www.youtube.com/watch?v=abc"
+
+def test_fetch_video_metadata_is_cached(config):
+    first = fetch_video_metadata("abc", config)
+    second = fetch_video_metadata("abc", config)
+
+    assert second is first
+    assert StubYouTubeHandler.requests == ["/oembed", "/watch"]
+
+def test_failed_lookup_falls_back_and_is_not_cached(config):
+    StubYouTubeHandler.delay_s = 0.5
+    slow = YouTubeConfig(base_url=config.base_url, request_timeout_s=0.1)
+
+    metadata = fetch_video_metadata("abc", slow)
+
+    assert metadata["title"] == "Untitled Video"
+    assert metadata["author"] == "Unknown Author"
+    assert metadata_cache.get("abc") is None
+
+def test_metadata_is_fetched_next_to_the_transcript(config):
+    StubYouTubeHandler.delay_s = 0.3
+
+    def fetch_transcript(video_id):
+        time.sleep(0.6)
+        return TRANSCRIPT
+
+    start = time.monotonic()
+    transcript, metadata = fetch_transcript_with_metadata("abc", fetch_transcript, config)
+    elapsed = time.monotonic() - start
+
+    assert transcript == TRANSCRIPT
+    assert metadata["title"] == "Stub video abc"
+    # oEmbed + watch page take 0.6s, the same as the transcript; sequential would be 1.2s
+    assert elapsed < 1.0
@@ -0,0 +1,85 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Optional
+
+class AgentPool:
+    """Pool of pre-built autogen agents shared by all Streamlit sessions.
+
+    Building an agent parses its llm_config, registers tools and, for the writer,
+    sets up the context compressor. The pool does that work once and hands out
+    agents exclusively: an agent is only visible to one caller between `acquire`
+    and release, and its history is cleared before it goes back to the pool.
+    """
+    def __init__(self, factories: Dict[str, Callable[[], Any]], max_idle: int = 4):
+        """
+        Args:
+            factories (Dict[str, Callable]): Agent kind -> zero-argument builder
+            max_idle (int): Maximum number of idle agents kept per kind
+        """
+        self.factories = factories
+        self.max_idle = max_idle
+        self._idle = {kind: queue.LifoQueue() for kind in factories}
+        self._warm_lock = threading.Lock()
+        self._warm_thread: Optional[threading.Thread] = None
+
+    def warm(self, kinds: Optional[Iterable[str]] = None, count: int = 1) -> None:
+        """Build `count` agents of each kind in a background thread (once per process)."""
+        with self._warm_lock:
+            if self._warm_thread is not None:
+                return
+            kinds = list(kinds or self.factories)
+
+            def build():
+                for kind in kinds:
+                    for _ in range(count - self._idle[kind].qsize()):
+                        try:
+                            self._idle[kind].put(self.factories[kind]())
+                        except Exception as e:
+                            print(f"Error pre-building {kind} agent: {e}")
+
+            self._warm_thread = threading.Thread(target=build, name="agent-pool-warmup", daemon=True)
+            self._warm_thread.start()
+
+    @contextmanager
+    def acquire(self, kind: str):
+        """Borrow an agent of the given kind, building one if none is idle.
+
+        Args:
+            kind (str): Agent kind registered in `factories`
+
+        Yields:
+            The agent (or agent bundle) built by the factory
+        """
+        try:
+            agent = self._idle[kind].get_nowait()
+        except queue.Empty:
+            agent = self.factories[kind]()
+        try:
+            yield agent
+        finally:
+            self._release(kind, agent)
+
+    def _release(self, kind: str, agent) -> None:
+        """Reset an agent and return it to the pool, or discard it if the reset fails."""
+        try:
+            reset_agent(agent)
+        except Exception as e:
+            # A half-reset agent must not be handed to another session
+            print(f"Error resetting {kind} agent, discarding it: {e}")
+            return
+        if self._idle[kind].qsize() < self.max_idle:
+            self._idle[kind].put(agent)
+
+    def stats(self) -> Dict[str, int]:
+        """Number of idle agents per kind."""
+        return {kind: idle.qsize() for kind, idle in self._idle.items()}
+
+def reset_agent(agent) -> None:
+    """Clear chat history and reply state of an agent or of every agent in a bundle."""
+    if hasattr(agent, "reset"):
+        agent.reset()
+    else:
+        for member in vars(agent).values():
+            if hasattr(member, "reset"):
+                member.reset()
@@ -0,0 +1,148 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from config import CacheConfig
+
+ARXIV_ID_PATTERN = re.compile(r"^\d{4}\.\d{4,5}(v\d+)?$")
+
+class ArxivCache:
+    """Local SQLite store of arXiv paper metadata and keyword search results.
+
+    Papers are stored by arXiv id (without version) and indexed with FTS5 over title
+    and summary when the SQLite build supports it. Keyword searches store the ordered
+    ids they returned. Entries older than `ttl_s` count as misses unless `offline`
+    is set, in which case everything cached is served and nothing is fetched.
+    """
+    def __init__(self, path: str, ttl_s: int, offline: bool = False):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl_s = ttl_s
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS papers(
+                id TEXT PRIMARY KEY,
+                title TEXT,
+                summary TEXT,
+                pdf_url TEXT,
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS searches(
+                query TEXT PRIMARY KEY,
+                max_results INTEGER,
+                paper_ids TEXT,
+                fetched_at REAL
+            );
+        """)
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(id UNINDEXED, title, summary)"
+            )
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self._conn.commit()
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return self.offline or time.time() - fetched_at < self.ttl_s
+
+    @staticmethod
+    def _row_to_paper(row) -> dict:
+        return {"id": row[0], "title": row[1], "summary": row[2], "pdf_url": row[3]}
+
+    def get_paper(self, paper_id: str) -> Optional[dict]:
+        """Look up a paper by arXiv id (a version suffix is ignored)."""
+        paper_id = re.sub(r"v\d+$", "", paper_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, title, summary, pdf_url, fetched_at FROM papers WHERE id = ?", (paper_id,)
+            ).fetchone()
+        if row is None or not self._fresh(row[4]):
+            return None
+        return self._row_to_paper(row)
+
+    def put_papers(self, papers: List[dict]) -> None:
+        now = time.time()
+        with self._lock:
+            for paper in papers:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO papers(id, title, summary, pdf_url, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (paper["id"], paper["title"], paper["summary"], paper["pdf_url"], now),
+                )
+                if self.has_fts:
+                    self._conn.execute("DELETE FROM papers_fts WHERE id = ?", (paper["id"],))
+                    self._conn.execute(
+                        "INSERT INTO papers_fts(id, title, summary) VALUES (?, ?, ?)",
+                        (paper["id"], paper["title"], paper["summary"]),
+                    )
+            self._conn.commit()
+
+    def get_search(self, query: str, max_results: int) -> Optional[List[dict]]:
+        """Return the cached results of a keyword search, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT max_results, paper_ids, fetched_at FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+            if row is None or row[0] < max_results or not self._fresh(row[2]):
+                return None
+            paper_ids = json.loads(row[1])[:max_results]
+            rows = {
+                r[0]: r for r in self._conn.execute(
+                    f"SELECT id, title, summary, pdf_url FROM papers WHERE id IN ({','.join('?' * len(paper_ids))})",
+                    paper_ids,
+                )
+            } if paper_ids else {}
+        if len(rows) < len(paper_ids):
+            return None
+        return [self._row_to_paper(rows[paper_id]) for paper_id in paper_ids]
+
+    def put_search(self, query: str, max_results: int, papers: List[dict]) -> None:
+        self.put_papers(papers)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches(query, max_results, paper_ids, fetched_at) VALUES (?, ?, ?, ?)",
+                (query, max_results, json.dumps([paper["id"] for paper in papers]), time.time()),
+            )
+            self._conn.commit()
+
+    def search_local(self, text: str, limit: int = 10) -> List[dict]:
+        """Full-text search over the titles and abstracts of every cached paper."""
+        terms = re.findall(r"\w+", text)
+        if not terms:
+            return []
+        with self._lock:
+            if self.has_fts:
+                rows = self._conn.execute(
+                    "SELECT p.id, p.title, p.summary, p.pdf_url FROM papers_fts f JOIN papers p ON p.id = f.id "
+                    "WHERE papers_fts MATCH ? ORDER BY rank LIMIT ?",
+                    (" ".join(f'"{term}"' for term in terms), limit),
+                ).fetchall()
+            else:
+                where = " AND ".join("(title LIKE ? OR summary LIKE ?)" for _ in terms)
+                params = [p for term in terms for p in (f"%{term}%", f"%{term}%")]
+                rows = self._conn.execute(
+                    f"SELECT id, title, summary, pdf_url FROM papers WHERE {where} LIMIT ?", (*params, limit)
+                ).fetchall()
+        return [self._row_to_paper(row) for row in rows]
+
+_arxiv_cache: Optional[ArxivCache] = None
+_arxiv_cache_lock = threading.Lock()
+
+def get_arxiv_cache() -> ArxivCache:
+    """Return the process-wide arXiv cache, creating the database on first use."""
+    global _arxiv_cache
+    if _arxiv_cache is None:
+        with _arxiv_cache_lock:
+            if _arxiv_cache is None:
+                config = CacheConfig()
+                _arxiv_cache = ArxivCache(
+                    os.path.join(config.cache_dir, "arxiv.sqlite3"),
+                    ttl_s=config.arxiv_ttl_s,
+                    offline=config.arxiv_offline,
+                )
+    return _arxiv_cache
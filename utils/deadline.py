@@ -0,0 +1,112 @@
+import contextvars
+import time
+from concurrent.futures import Future, TimeoutError
+from contextlib import contextmanager
+from typing import Any, List, Optional
+
+class Deadline:
+    """Wall-clock budget for one request, handed down to every stage that can wait.
+
+    Stages ask for a time slice (`slice`) bounded by what is left of the budget minus
+    what later stages must keep, and record the optional sources they had to drop
+    (`skip`) so the answer can say it is partial.
+    """
+    def __init__(self, budget_s: float):
+        self.budget_s = budget_s
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + budget_s
+        self.skipped: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def slice(self, max_s: Optional[float] = None, reserve_s: float = 0.0) -> float:
+        """Seconds a stage may use: at most `max_s`, leaving `reserve_s` for later stages."""
+        available = max(0.0, self.remaining() - reserve_s)
+        return available if max_s is None else min(max_s, available)
+
+    def guarantee(self, min_s: float) -> "Deadline":
+        """This deadline, pushed back if needed so that at least `min_s` is left.
+
+        For mandatory stages (the writer's first draft) that must get to run however
+        long the optional ones took. Skipped sources are shared with this deadline.
+        """
+        deadline = Deadline(self.budget_s)
+        deadline.started_at = self.started_at
+        deadline.expires_at = max(self.expires_at, time.monotonic() + min_s)
+        deadline.skipped = self.skipped
+        return deadline
+
+    def skip(self, source: str) -> None:
+        if source not in self.skipped:
+            self.skipped.append(source)
+
+    def wait(self, future: Future, source: str, timeout: float, default: Any = "") -> Any:
+        """Return the result of `future` within `timeout` seconds, or `default` if it is late or failed.
+
+        A late branch is cancelled if it has not started yet. A running one cannot be
+        interrupted, so branches bound their own blocking calls (HTTP, actor runs, LLM
+        calls, governor queueing) by `current_deadline()` and give their worker back
+        soon after the budget is spent; their result is ignored.
+        """
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            print(f"{source} skipped: no result within {timeout:.1f}s")
+        except Exception as e:
+            print(f"{source} failed: {e}")
+        self.skip(source)
+        return default
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being served, if any.
+
+    Set with `use_deadline`; branches submitted with `tracing.submit_in_context`
+    inherit it.
+    """
+    return _current_deadline.get()
+
+@contextmanager
+def use_deadline(deadline: Deadline):
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+def bounded_timeout(default_s: float, floor_s: float = 1.0) -> float:
+    """`default_s`, cut to what is left of the current deadline (but at least `floor_s`)."""
+    deadline = current_deadline()
+    if deadline is None:
+        return default_s
+    return max(floor_s, min(default_s, deadline.remaining()))
+
+def degraded_answer(context: str, skipped: List[str], max_chars: int = 2000) -> str:
+    """Answer returned when the writer could not produce one: the retrieved context as is."""
+    parts = ["Sorry, I could not write a full answer in time."]
+    if context.strip():
+        excerpt = context.strip()
+        if len(excerpt) > max_chars:
+            excerpt = excerpt[:max_chars].rstrip() + " ..."
+        parts.append(f"Here is the information I found for your question:\n\n{excerpt}")
+    if skipped:
+        parts.append(f"Skipped sources: {', '.join(skipped)}.")
+    return "\n\n".join(parts)
+
+def skipped_sources_note(skipped: List[str]) -> str:
+    """Instruction for the writer when some sources did not make it into the context."""
+    if not skipped:
+        return ""
+    return (
+        f"Note: the following sources were skipped because they failed or did not respond in time: {', '.join(skipped)}. "
+        "Answer from the available context and briefly mention that the answer may be incomplete."
+    )
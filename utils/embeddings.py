@@ -0,0 +1,119 @@
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import EmbeddingConfig
+
+# Served by Chroma's bundled ONNX export (no torch needed) when the backend is "onnx"
+CHROMA_ONNX_MODEL = "all-MiniLM-L6-v2"
+
+def model_slug(model_name: str) -> str:
+    """Lowercase, collection-name safe form of a model name, e.g. "snowflake-arctic-embed-m"."""
+    name = model_name.rstrip("/").split("/")[-1].lower()
+    return re.sub(r"[^a-z0-9]+", "-", name).strip("-")[:40]
+
+class EmbeddingProvider:
+    """Process-wide sentence embedding model with batched encoding and throughput stats.
+
+    Callable with a list of texts, so one instance can be handed to Chroma as the
+    embedding function of a collection and used directly by other pipelines. The
+    model is loaded on first use, once per process.
+
+    Backends:
+        - "onnx": onnxruntime on CPU. all-MiniLM-L6-v2 uses Chroma's bundled export;
+          other models go through sentence-transformers' ONNX backend.
+        - "torch": sentence-transformers on torch.
+    """
+    def __init__(self, model_name: str, backend: str = "onnx", batch_size: int = 64):
+        self.model_name = model_name
+        self.backend = backend
+        self.batch_size = batch_size
+        self.slug = model_slug(model_name)
+        self._encode = None
+        self._load_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._texts = 0
+        self._batches = 0
+        self._seconds = 0.0
+
+    def _load(self):
+        if self._encode is not None:
+            return self._encode
+        with self._load_lock:
+            if self._encode is None:
+                start = time.perf_counter()
+                if self.backend == "onnx" and model_slug(self.model_name) == model_slug(CHROMA_ONNX_MODEL):
+                    from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+                    model = ONNXMiniLM_L6_V2(preferred_providers=["CPUExecutionProvider"])
+                    self._encode = lambda texts: np.asarray(model(texts), dtype=np.float32)
+                else:
+                    self._encode = self._load_sentence_transformer()
+                print(f"Loaded embedding model {self.model_name} ({self.backend}) in {time.perf_counter() - start:.1f}s")
+        return self._encode
+
+    def _load_sentence_transformer(self):
+        from sentence_transformers import SentenceTransformer
+        try:
+            model = SentenceTransformer(self.model_name, backend=self.backend, device="cpu")
+        except Exception as e:
+            if self.backend == "torch":
+                raise
+            print(f"No {self.backend} backend for {self.model_name}, falling back to torch: {e}")
+            model = SentenceTransformer(self.model_name, device="cpu")
+        return lambda texts: model.encode(
+            texts, batch_size=len(texts), normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embed texts in batches of `batch_size` (the provider default if None)."""
+        encode = self._load()
+        batch_size = batch_size or self.batch_size
+        embeddings = []
+        for batch_start in range(0, len(texts), batch_size):
+            batch = list(texts[batch_start:batch_start + batch_size])
+            start = time.perf_counter()
+            vectors = encode(batch)
+            elapsed = time.perf_counter() - start
+            with self._stats_lock:
+                self._texts += len(batch)
+                self._batches += 1
+                self._seconds += elapsed
+            embeddings.extend(vectors.tolist())
+        return embeddings
+
+    def __call__(self, input: List[str]) -> List[List[float]]:
+        # Chroma's EmbeddingFunction protocol: the parameter must be called `input`
+        return self.embed(input)
+
+    def stats(self) -> Dict:
+        """Texts and batches embedded so far, time spent in the model and texts per second."""
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                "backend": self.backend,
+                "texts": self._texts,
+                "batches": self._batches,
+                "seconds": self._seconds,
+                "texts_per_s": self._texts / self._seconds if self._seconds else 0.0,
+            }
+
+_providers: Dict[Tuple[str, str], EmbeddingProvider] = {}
+_providers_lock = threading.Lock()
+
+def get_embedding_provider(model_name: Optional[str] = None, config: EmbeddingConfig = None) -> EmbeddingProvider:
+    """Return the process-wide provider of a model (`config.model_name` by default).
+
+    Pipelines asking for the same model and backend share one loaded model.
+    """
+    config = config or EmbeddingConfig()
+    key = (model_name or config.model_name, config.backend)
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                provider = _providers[key] = EmbeddingProvider(key[0], backend=key[1], batch_size=config.batch_size)
+    return provider
@@ -0,0 +1,258 @@
+import contextvars
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from enum import IntEnum
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+from config import LLMGovernorConfig
+from utils.deadline import bounded_timeout, current_deadline
+from utils.tracing import increment, record_usage
+
+# Timeout (seconds) of the completion being made by the current thread, see govern_agent
+_call_timeout: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("llm_call_timeout", default=None)
+
+class Priority(IntEnum):
+    """Priority classes for upstream LLM calls. Lower values are served first."""
+    INTERACTIVE = 0  # user-facing final answers (writer, chat, mindmap, video)
+    AGENT = 1        # auxiliary agent steps on the request path
+    BACKGROUND = 2   # evaluation and guardrail feedback
+
+class TokenBucket:
+    """Token bucket polled by the governor while it holds its lock.
+
+    Tokens are only taken by the caller the governor lets through, so the order in
+    which they are handed out follows the priority queue, not arrival order.
+    """
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+
+    def time_to_token(self) -> float:
+        """Seconds until a whole token is available, 0.0 if one is available now."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+class LLMGovernor:
+    """Process-wide gate in front of every governed LLM call (Mistral, OpenAI, Cortex).
+
+    Callers queue by priority. The best-ranked waiter whose token bucket has a token
+    gets the next of `max_concurrency` slots together with the token, so a higher
+    priority call is never queued behind tokens reserved by lower priority ones, and
+    nobody holds a slot while waiting for the rate limit. The bucket is the one of
+    the caller's model (`"<provider>:<model>"` in `rate_limits`) if it has its own
+    limit, else the one of its provider; providers without a limit only wait for a
+    slot. Queue-wait time is tracked per priority class.
+    """
+    def __init__(self, config: Optional[LLMGovernorConfig] = None):
+        self.config = config or LLMGovernorConfig()
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._buckets = {
+            provider: TokenBucket(rate, burst)
+            for provider, (rate, burst) in self.config.rate_limits.items()
+        }
+        self._waits = {priority: deque(maxlen=1000) for priority in Priority}
+        self._calls = {priority: 0 for priority in Priority}
+
+    def _bucket(self, provider: str) -> Optional[TokenBucket]:
+        return self._buckets.get(provider) or self._buckets.get(provider.split(":", 1)[0])
+
+    def _time_to_turn(self, ticket) -> float:
+        """0.0 if `ticket` may go now, else how long to wait before checking again."""
+        if self._active >= self.config.max_concurrency:
+            return math.inf
+        for waiting in sorted(self._waiting):
+            bucket = waiting[2]
+            delay = bucket.time_to_token() if bucket is not None else 0.0
+            if waiting is ticket:
+                return delay
+            if delay == 0.0:
+                # A better-ranked caller can go now and takes the free slot first
+                return math.inf
+        return math.inf
+
+    @contextmanager
+    def slot(self, provider: str, priority: Priority = Priority.AGENT):
+        """Block until a concurrency slot and a rate-limit token are available.
+
+        Yields:
+            float: Seconds spent waiting in the queue
+
+        Raises:
+            TimeoutError: If no slot frees up within `max_queue_wait` seconds, or the
+                request deadline (see `utils.deadline.current_deadline`) runs out first
+        """
+        start = time.monotonic()
+        max_wait = self.config.max_queue_wait
+        reason = f"nothing freed up within {max_wait:.0f}s"
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() < max_wait:
+            max_wait = deadline.remaining()
+            reason = "the request deadline expired"
+        bucket = self._bucket(provider)
+        # The sequence number is unique, so tickets never compare their buckets
+        ticket = (int(priority), next(self._seq), bucket)
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                delay = self._time_to_turn(ticket)
+                if delay == 0.0:
+                    break
+                remaining = start + max_wait - time.monotonic()
+                if remaining <= 0 or (delay != math.inf and delay > remaining):
+                    self._waiting.remove(ticket)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                    waiting_for = "slot" if delay == math.inf else "rate-limit token"
+                    raise TimeoutError(f"Timed out waiting for a {provider} LLM {waiting_for}: {reason}")
+                self._cond.wait(min(delay, remaining))
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            if bucket is not None:
+                bucket.take()
+            self._active += 1
+            self._cond.notify_all()
+        try:
+            wait = time.monotonic() - start
+            self._record_wait(priority, wait)
+            # Shown on the span of the calling step in the request trace
+            increment("llm.queue_wait_ms", int(wait * 1000))
+            yield wait
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+    def call(self, provider: str, priority: Priority, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` inside a governed slot."""
+        with self.slot(provider, priority):
+            return fn(*args, **kwargs)
+
+    def _record_wait(self, priority: Priority, wait: float) -> None:
+        with self._cond:
+            self._waits[priority].append(wait)
+            self._calls[priority] += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot of queue-wait statistics per priority class."""
+        with self._cond:
+            snapshot = {
+                "active": self._active,
+                "queued": len(self._waiting),
+                "priorities": {},
+            }
+            for priority, waits in self._waits.items():
+                ordered = sorted(waits)
+                snapshot["priorities"][priority.name.lower()] = {
+                    "calls": self._calls[priority],
+                    "mean_wait_s": sum(ordered) / len(ordered) if ordered else 0.0,
+                    "p95_wait_s": ordered[round(0.95 * (len(ordered) - 1))] if ordered else 0.0,
+                    "max_wait_s": ordered[-1] if ordered else 0.0,
+                }
+        return snapshot
+
+_governor: Optional[LLMGovernor] = None
+_governor_lock = threading.Lock()
+
+def get_governor() -> LLMGovernor:
+    """Return the process-wide governor shared by all Streamlit sessions."""
+    global _governor
+    if _governor is None:
+        with _governor_lock:
+            if _governor is None:
+                _governor = LLMGovernor()
+    return _governor
+
+def provider_for_config(llm_config_entry: dict) -> str:
+    """Map an autogen config_list entry to its rate-limit key, `"<provider>:<model>"`."""
+    provider = "mistral" if llm_config_entry.get("api_type") == "mistral" else "openai"
+    model = llm_config_entry.get("model")
+    return f"{provider}:{model}" if model else provider
+
+def governed_complete(client, priority: Priority = Priority.INTERACTIVE, **kwargs):
+    """Governed replacement for `mistral_client.chat.complete(**kwargs)`, with a request timeout."""
+    kwargs.setdefault("timeout_ms", int(bounded_timeout(get_governor().config.request_timeout_s) * 1000))
+    response = get_governor().call(f"mistral:{kwargs.get('model')}", priority, client.chat.complete, **kwargs)
+    record_usage(response)
+    return response
+
+def _bind_call_timeout(model_client) -> None:
+    """Make an autogen Mistral/OpenAI model client send the timeout set in `_call_timeout`.
+
+    The timeout is injected into the SDK call rather than passed through autogen's
+    create params, which would make it part of autogen's cache key.
+    """
+    if hasattr(model_client, "_oai_client"):
+        # openai: chat.completions.create(timeout=seconds)
+        target, method, key, convert = model_client._oai_client.chat.completions, "create", "timeout", float
+    elif hasattr(getattr(model_client, "_client", None), "chat"):
+        # mistralai: chat.complete(timeout_ms=milliseconds)
+        target, method, key, convert = model_client._client.chat, "complete", "timeout_ms", lambda s: int(s * 1000)
+    else:
+        return
+    call = getattr(target, method)
+
+    @wraps(call)
+    def call_with_timeout(*args, **kwargs):
+        timeout_s = _call_timeout.get()
+        if timeout_s is not None:
+            kwargs.setdefault(key, convert(timeout_s))
+        return call(*args, **kwargs)
+
+    setattr(target, method, call_with_timeout)
+
+def govern_agent(agent, priority: Priority = Priority.AGENT):
+    """Route every completion an autogen agent makes through the governor.
+
+    The agent's `llm_config` is turned into an OpenAIWrapper at construction time, so
+    the wrapper's `create` is replaced in place. The provider is taken from the first
+    entry of the config list, which is the one autogen tries first. Every completion
+    gets an HTTP timeout of `request_timeout_s`, cut to what is left of the request
+    deadline, so a late branch gives its worker and its slot back.
+
+    Args:
+        agent: An autogen ConversableAgent
+        priority (Priority): Priority class for this agent's calls
+
+    Returns:
+        The same agent, for chaining
+    """
+    client = getattr(agent, "client", None)
+    if client is None or getattr(client, "_governed", False):
+        return agent
+
+    config_list = (agent.llm_config or {}).get("config_list") or [{}]
+    provider = provider_for_config(config_list[0])
+    create = client.create
+    for model_client in getattr(client, "_clients", []):
+        _bind_call_timeout(model_client)
+
+    @wraps(create)
+    def governed_create(**config):
+        governor = get_governor()
+        token = _call_timeout.set(bounded_timeout(governor.config.request_timeout_s))
+        try:
+            response = governor.call(provider, priority, create, **config)
+        finally:
+            _call_timeout.reset(token)
+        record_usage(response)
+        return response
+
+    client.create = governed_create
+    client._governed = True
+    return agent
@@ -0,0 +1,132 @@
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from prompts.intent_classifier import INTENT_EXAMPLES, INTENT_LABELS
+
+# (pattern, label, confidence) - the strongest matching rule per label wins
+INTENT_RULES = [
+    (r"\b\d{4}\.\d{4,5}(v\d+)?\b", "papers_search", 0.95),
+    (r"\barxiv\b", "papers_search", 0.9),
+    (r"\b(papers?|articles?|preprints?|publications?|survey)\b", "papers_search", 0.75),
+    (r"\b(right now|today|tonight|yesterday|this (week|month|year)|latest|breaking)\b", "web_search", 0.85),
+    (r"\b(stock|share) price\b|\bprice of\b|\bweather\b|\bnews\b", "web_search", 0.85),
+    (r"\b(coin|token|crypto\w*)\b", "web_search", 0.7),
+    (r"\b(uploaded|upload|my (file|document|pdf)s?|the (document|pdf|report))\b", "uploaded_document_read", 0.85),
+    (r"\baccording to the (authors?|report|study|document)\b|\bthe authors\b", "uploaded_document_read", 0.8),
+    (r"^\s*(hi|hello|hey|thanks|thank you)\b", "general", 0.8),
+]
+
+def normalize_intent(text: str) -> str:
+    """Map free-form classifier output to one of `INTENT_LABELS` ("general" if none matches)."""
+    text = (text or "").strip().lower()
+    for label in INTENT_LABELS:
+        if text == label:
+            return label
+    for label in INTENT_LABELS:
+        if re.search(rf"\b{label}\b", text):
+            return label
+    return "general"
+
+class LocalIntentClassifier:
+    """Millisecond intent classifier: regex rules plus embedding similarity to labeled examples.
+
+    The embedding model is the process-wide one shared with the video store, loaded on
+    first use. If it cannot be loaded the classifier
+    falls back to the rules alone, which only report confidence when a rule fires.
+    The softmax over labels only says which label is closest, not whether any is
+    close, so embedding evidence counts only if the best example similarity reaches
+    `min_similarity`. With no evidence at all `predict` returns no label.
+    """
+    def __init__(
+        self,
+        examples: List[Tuple[str, str]] = INTENT_EXAMPLES,
+        rules: List[Tuple[str, str, float]] = INTENT_RULES,
+        temperature: float = 0.05,
+        min_similarity: float = 0.4,
+    ):
+        self.examples = examples
+        self.rules = [(re.compile(pattern, re.IGNORECASE), label, weight) for pattern, label, weight in rules]
+        self.temperature = temperature
+        self.min_similarity = min_similarity
+        self._embed = None
+        self._example_vectors: Optional[np.ndarray] = None
+        self._example_labels = np.array([label for _, label in examples])
+        self._lock = threading.Lock()
+        self._embedding_failed = False
+
+    def _load_embeddings(self) -> bool:
+        if self._example_vectors is not None:
+            return True
+        if self._embedding_failed:
+            return False
+        with self._lock:
+            if self._example_vectors is None and not self._embedding_failed:
+                try:
+                    self._load_example_vectors()
+                except Exception as e:
+                    print(f"Local intent classifier running on rules only: {e}")
+                    self._embedding_failed = True
+        return self._example_vectors is not None
+
+    def _load_example_vectors(self) -> None:
+        from utils.embeddings import get_embedding_provider
+        self._embed = get_embedding_provider()
+        self._example_vectors = self._encode([text for text, _ in self.examples])
+
+    def load(self) -> None:
+        """Load the embedding model now, raising instead of falling back to the rules."""
+        with self._lock:
+            if self._example_vectors is None:
+                self._load_example_vectors()
+                self._embedding_failed = False
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = np.asarray(self._embed(texts), dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    def rule_scores(self, message: str) -> Dict[str, float]:
+        scores = {label: 0.0 for label in INTENT_LABELS}
+        for pattern, label, weight in self.rules:
+            if pattern.search(message):
+                scores[label] = max(scores[label], weight)
+        return scores
+
+    def embedding_scores(self, message: str) -> Dict[str, float]:
+        """Softmax over the best example similarity of each label, all 0 below `min_similarity`."""
+        if not self._load_embeddings():
+            return {label: 0.0 for label in INTENT_LABELS}
+        similarities = self._example_vectors @ self._encode([message])[0]
+        best = np.array([
+            similarities[self._example_labels == label].max() if (self._example_labels == label).any() else -1.0
+            for label in INTENT_LABELS
+        ])
+        if best.max() < self.min_similarity:
+            return {label: 0.0 for label in INTENT_LABELS}
+        weights = np.exp((best - best.max()) / self.temperature)
+        probabilities = weights / weights.sum()
+        return dict(zip(INTENT_LABELS, probabilities.tolist()))
+
+    def predict(self, message: str) -> Tuple[Optional[str], float]:
+        """Classify a message.
+
+        Rule and embedding evidence are combined per label with a noisy-OR.
+
+        Returns:
+            Tuple[Optional[str], float]: Intent label and a confidence in [0, 1], or
+                (None, 0.0) if no rule fires and no example is similar enough
+        """
+        rules = self.rule_scores(message)
+        embeddings = self.embedding_scores(message)
+        combined = {
+            label: 1 - (1 - rules[label]) * (1 - embeddings[label])
+            for label in INTENT_LABELS
+        }
+        label = max(combined, key=combined.get)
+        if combined[label] <= 0.0:
+            return None, 0.0
+        return label, combined[label]
+
+local_intent_classifier = LocalIntentClassifier()
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+from typing import Any, Dict, Union
+
+from config import MODEL_ROUTES, MODEL_TIERS
+
+DEFAULT_TIER = "large"
+
+def get_tier(step: str) -> str:
+    """Return the model tier configured for an LLM call site."""
+    return MODEL_ROUTES.get(step, DEFAULT_TIER)
+
+def get_llm_config(step: str) -> dict:
+    """Build the autogen `llm_config` for an LLM call site from `MODEL_ROUTES`.
+
+    Args:
+        step (str): Name of the call site, e.g. "intent_classifier" or "writer"
+
+    Returns:
+        dict: llm_config with the config list of the routed tier
+    """
+    return {"config_list": MODEL_TIERS[get_tier(step)]}
+
+def reply_text(reply: Union[str, dict, None]) -> str:
+    """Normalize an autogen reply to text.
+
+    Mistral configs come back as message dicts while OpenAI configs come back as
+    plain strings, so the shape depends on which tier (and fallback) served the call.
+    """
+    if reply is None:
+        return ""
+    if isinstance(reply, dict):
+        return reply.get("content") or ""
+    return reply
+
+class StepLatencyRecorder:
+    """Keeps recent LLM latencies per call site so routing choices can be checked."""
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._models = {}
+
+    def record(self, step: str, seconds: float, model: str = None) -> None:
+        with self._lock:
+            self._latencies[step].append(seconds)
+            if model:
+                self._models[step] = model
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            summary = {}
+            for step, latencies in self._latencies.items():
+                ordered = sorted(latencies)
+                summary[step] = {
+                    "tier": get_tier(step),
+                    "model": self._models.get(step),
+                    "calls": len(ordered),
+                    "mean_s": sum(ordered) / len(ordered),
+                    "p95_s": ordered[round(0.95 * (len(ordered) - 1))],
+                }
+            return summary
+
+step_latencies = StepLatencyRecorder()
+
+def record_step_latency(agent, step: str):
+    """Time every completion an autogen agent makes under the given call site name.
+
+    Apply it before `govern_agent`, so the governor wraps the timed call and the
+    recorded latency is the model's alone, without the wait for a slot.
+
+    Args:
+        agent: An autogen ConversableAgent built with `get_llm_config(step)`
+        step (str): Call site name used in `MODEL_ROUTES`
+
+    Returns:
+        The same agent, for chaining
+    """
+    client = getattr(agent, "client", None)
+    if client is None:
+        return agent
+    create = client.create
+
+    @wraps(create)
+    def timed_create(**config):
+        start = time.perf_counter()
+        response = create(**config)
+        step_latencies.record(step, time.perf_counter() - start, getattr(response, "model", None))
+        return response
+
+    client.create = timed_create
+    return agent
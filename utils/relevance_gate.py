@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Optional
+
+from config import CacheConfig, RelevanceGateConfig
+
+SKIP_EXTERNAL = "skip_external"
+EXPAND = "expand"
+DEFAULT = "default"
+NO_SCORES = "no_scores"
+
+def result_score(result: Any) -> Optional[float]:
+    """Relevance score of one Cortex Search result, or None if it carries none.
+
+    Scores come back under `@scores` (e.g. {"cosine_similarity": .., "text_match": ..})
+    depending on the service version, so every numeric field is accepted and the
+    cosine similarity preferred.
+    """
+    if not isinstance(result, dict):
+        return None
+    scores = result.get("@scores")
+    if isinstance(scores, (int, float)):
+        return float(scores)
+    if isinstance(scores, dict):
+        for key in ("cosine_similarity", "similarity", "score"):
+            if isinstance(scores.get(key), (int, float)):
+                return float(scores[key])
+        numeric = [float(v) for v in scores.values() if isinstance(v, (int, float))]
+        return max(numeric) if numeric else None
+    for key in ("@score", "@search_score", "score"):
+        if isinstance(result.get(key), (int, float)):
+            return float(result[key])
+    return None
+
+def top_score(results: Iterable[Any]) -> Optional[float]:
+    scores = [score for score in map(result_score, results or []) if score is not None]
+    return max(scores) if scores else None
+
+@dataclass
+class GateDecision:
+    action: str
+    top_score: Optional[float]
+    num_chunks: int
+
+    @property
+    def skip_external(self) -> bool:
+        return self.action == SKIP_EXTERNAL
+
+class RelevanceGate:
+    """Decides from Cortex Search scores whether the uploaded documents already answer a query.
+
+    Above `skip_external_above` the web and paper agents are skipped; below
+    `expand_below` the search is repeated with more chunks. If logging is enabled,
+    every decision is appended to a JSONL log so the thresholds can be tuned offline;
+    queries are logged as a hash unless `log_queries` is set, and the log is rotated
+    to one backup beyond `log_max_bytes`.
+    """
+    def __init__(self, config: RelevanceGateConfig, log_path: Optional[str] = None):
+        self.config = config
+        self.log_path = log_path
+        self._lock = threading.Lock()
+
+    def decide(self, results: list, num_chunks: int) -> GateDecision:
+        score = top_score(results)
+        if score is None:
+            action = NO_SCORES
+        elif score >= self.config.skip_external_above:
+            action = SKIP_EXTERNAL
+        elif score < self.config.expand_below and num_chunks < self.config.expanded_chunks:
+            action = EXPAND
+        else:
+            action = DEFAULT
+        return GateDecision(action=action, top_score=score, num_chunks=num_chunks)
+
+    def log(self, query: str, decision: GateDecision, **extra) -> None:
+        if not self.log_path:
+            return
+        if self.config.log_queries:
+            logged_query = {"query": query}
+        else:
+            logged_query = {
+                "query_sha256": hashlib.sha256(query.encode("utf-8")).hexdigest()[:16],
+                "query_chars": len(query),
+            }
+        record = {"ts": time.time(), **logged_query, **asdict(decision), **extra}
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+                if os.path.exists(self.log_path) and os.path.getsize(self.log_path) >= self.config.log_max_bytes:
+                    os.replace(self.log_path, f"{self.log_path}.1")
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not log relevance gate decision: {e}")
+
+def get_relevance_gate(config: RelevanceGateConfig = None) -> RelevanceGate:
+    config = config or RelevanceGateConfig()
+    log_path = os.path.join(CacheConfig().cache_dir, "relevance_gate.jsonl") if config.log_decisions else None
+    return RelevanceGate(config, log_path=log_path)
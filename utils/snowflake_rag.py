@@ -6,6 +6,8 @@ from typing import List, Dict, Any
 import os
 from mistralai import Mistral
 
+from utils.llm_governor import governed_complete
+
 from config import MISTRAL_API_KEY, SNOWFLAKE_ACCOUNT, SNOWFLAKE_DATABASE, SNOWFLAKE_PASSWORD, SNOWFLAKE_SCHEMA, SNOWFLAKE_USER
 
 class SnowflakeRAG:
@@ -123,7 +125,8 @@ class SnowflakeRAG:
             {prompt}
             '''
             
-            response = self.mistral_client.chat.complete(
+            response = governed_complete(
+                self.mistral_client,
                 model=model_name,
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -1,11 +1,37 @@
 
+from typing import Any, List
+
 import snowflake.connector
 from tqdm.auto import tqdm
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+from llama_index.core.base.embeddings.base import BaseEmbedding
 from llama_index.core.node_parser import SemanticSplitterNodeParser
 from llama_index.core.ingestion import IngestionPipeline
 from PyPDF2 import PdfReader
 from llama_index.core import Document
+from pydantic import PrivateAttr
+
+from config import EmbeddingConfig
+from utils.embeddings import get_embedding_provider
+
+class ProviderEmbedding(BaseEmbedding):
+    """LlamaIndex embedding backed by a process-wide `EmbeddingProvider`, so uploads reuse one loaded model."""
+    _provider: Any = PrivateAttr()
+
+    def __init__(self, provider, **kwargs):
+        super().__init__(model_name=provider.model_name, embed_batch_size=provider.batch_size, **kwargs)
+        self._provider = provider
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._provider.embed([query])[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._provider.embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._provider.embed(texts)
 
 def setup_snowflake_docs_table(connection_params):
    """
@@ -140,8 +166,10 @@ def process_documents(documents: list[Document]):
     Returns:
         results: Processed results from the Semantic Splitting
     """
-    # Initialize the embedding model
-    embed_model = HuggingFaceEmbedding("Snowflake/snowflake-arctic-embed-m")
+    # Shared embedding model, loaded once per process (the video pipeline's unless a document model is set)
+    provider = get_embedding_provider(EmbeddingConfig().document_model_name or None)
+    embed_model = ProviderEmbedding(provider)
+    before = provider.stats()
     
     # Set up the splitter node parser
     splitter = SemanticSplitterNodeParser(
@@ -161,6 +189,9 @@ def process_documents(documents: list[Document]):
     for document in documents:
         for chunk in cortex_search_pipeline.run(show_progress=True, documents=[document]):
             yield chunk
+    stats = provider.stats()
+    texts, seconds = stats["texts"] - before["texts"], stats["seconds"] - before["seconds"]
+    print(f"Embedded {texts} texts with {provider.model_name} at {texts / seconds if seconds else 0:.0f} texts/s")
 
 
 def load_pdf_to_llamaindex(uploaded_file):
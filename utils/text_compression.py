@@ -0,0 +1,110 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from autogen.agentchat.contrib.capabilities.text_compressors import LLMLingua
+
+from utils.lru_cache import LRUCache
+from utils import tracing
+
+class SharedLLMLingua:
+    """Process-wide LLMLingua compressor with a cache of compressed texts.
+
+    Implements autogen's TextCompressor protocol so it can be passed straight to
+    `TextMessageCompressor`. The model is loaded once, in a background thread started
+    by `start_loading`, and shared by every WriterAgent. Compressed results are cached
+    by a hash of the text and the compression parameters. A request that finds the
+    model still loading waits at most `load_wait_s`, then passes its text through
+    uncompressed, as it does when the model failed to load.
+    """
+    def __init__(self, cache_size: int = 256, load_wait_s: float = 2.0):
+        self.cache = LRUCache(max_items=cache_size)
+        self.load_wait_s = load_wait_s
+        self._model: Optional[LLMLingua] = None
+        self._load_error: Optional[Exception] = None
+        self._loaded = threading.Event()
+        self._load_lock = threading.Lock()
+        self._load_thread: Optional[threading.Thread] = None
+        self._request = threading.local()
+
+    def start_loading(self) -> None:
+        """Start loading the LLMLingua model in the background (once per process)."""
+        with self._load_lock:
+            if self._load_thread is not None:
+                return
+            self._load_thread = threading.Thread(target=self._load, name="llmlingua-loader", daemon=True)
+            self._load_thread.start()
+
+    def _load(self) -> None:
+        try:
+            start = time.perf_counter()
+            self._model = LLMLingua()
+            print(f"LLMLingua loaded in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            self._load_error = e
+            print(f"Error loading LLMLingua: {e}")
+        finally:
+            self._loaded.set()
+
+    def _get_model(self) -> Optional[LLMLingua]:
+        """The loaded model, or None if it is not ready within `load_wait_s` or failed to load."""
+        self.start_loading()
+        self._loaded.wait(self.load_wait_s)
+        return self._model
+
+    def compress_text(self, text: str, **compression_params) -> Dict[str, Any]:
+        key = hashlib.sha256(
+            (text + json.dumps(compression_params, sort_keys=True, default=str)).encode("utf-8")
+        ).hexdigest()
+        start = time.perf_counter()
+        result = self.cache.get(key)
+        cache_hit = result is not None
+        if not cache_hit:
+            model = self._get_model()
+            if model is None:
+                # Not loaded (yet): the context goes to the writer uncompressed
+                tracing.increment("compression_skipped")
+                self._record_skip()
+                return {"compressed_prompt": text}
+            result = model.compress_text(text, **compression_params)
+            self.cache.put(key, result)
+        self._record(result, time.perf_counter() - start, cache_hit)
+        tracing.increment("compression_cache_hits" if cache_hit else "compression_cache_misses")
+        return result
+
+    def begin_request(self) -> None:
+        """Reset the compression statistics of the current thread's request."""
+        self._request.stats = {
+            "calls": 0,
+            "cache_hits": 0,
+            "skipped": 0,
+            "seconds": 0.0,
+            "origin_tokens": 0,
+            "compressed_tokens": 0,
+        }
+
+    def request_stats(self) -> Dict[str, Any]:
+        """Compression time and ratio accumulated since `begin_request`."""
+        stats = dict(getattr(self._request, "stats", None) or {})
+        if stats.get("compressed_tokens"):
+            stats["ratio"] = stats["origin_tokens"] / stats["compressed_tokens"]
+        return stats
+
+    def _record_skip(self) -> None:
+        stats = getattr(self._request, "stats", None)
+        if stats is not None:
+            stats["skipped"] += 1
+
+    def _record(self, result: Dict[str, Any], seconds: float, cache_hit: bool) -> None:
+        stats = getattr(self._request, "stats", None)
+        if stats is None:
+            return
+        stats["calls"] += 1
+        stats["cache_hits"] += int(cache_hit)
+        stats["seconds"] += seconds
+        stats["origin_tokens"] += result.get("origin_tokens", 0)
+        stats["compressed_tokens"] += result.get("compressed_tokens", 0)
+
+shared_compressor = SharedLLMLingua()
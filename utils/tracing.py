@@ -0,0 +1,177 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    from trulens.otel.semconv.trace import SpanAttributes
+    SPAN_TYPE_KEY = SpanAttributes.SPAN_TYPE
+except (ImportError, AttributeError):
+    SPAN_TYPE_KEY = "ai.observability.span_type"
+
+SERVICE_NAME = "lexis"
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: Optional[int] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration_s(self) -> float:
+        end_ns = self.end_ns if self.end_ns is not None else time.time_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+class Trace:
+    """Spans recorded for one request, possibly from several threads."""
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def waterfall(self) -> List[Dict[str, Any]]:
+        """Spans as rows with start offset, duration and nesting depth, in start order."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        if not spans:
+            return []
+        origin = spans[0].start_ns
+        depths = {}
+        rows = []
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1
+            depths[span.span_id] = depth
+            rows.append({
+                "name": span.name,
+                "depth": depth,
+                "start_s": (span.start_ns - origin) / 1e9,
+                "duration_s": span.duration_s,
+                "attributes": dict(span.attributes),
+                "error": span.error,
+            })
+        return rows
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Export as OTLP/JSON (`ExportTraceServiceRequest`), loadable by any OTLP collector."""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                            "name": span.name,
+                            "kind": 1,  # SPAN_KIND_INTERNAL
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns or span.start_ns),
+                            "attributes": _otlp_attributes(span.attributes),
+                            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+                        }
+                        for span in spans
+                    ],
+                }],
+            }],
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_otlp())
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[Dict[str, Any]]:
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
+
+_current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("current_trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+@contextmanager
+def start_trace(name: str, span_type: str = "record_root", **attributes) -> Iterator[Trace]:
+    """Start a new trace whose root span covers the `with` block."""
+    trace = Trace(name)
+    token = _current_trace.set(trace)
+    try:
+        with span(name, span_type=span_type, **attributes):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def span(name: str, span_type: str = "unknown", **attributes) -> Iterator[Optional[Span]]:
+    """Record a child span of the current span. Does nothing outside of `start_trace`."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    current = Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes={SPAN_TYPE_KEY: span_type, **attributes},
+    )
+    trace.add(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+def set_attributes(**attributes) -> None:
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+_counter_lock = threading.Lock()
+
+def increment(key: str, amount: int = 1) -> None:
+    """Add to a counter attribute (token counts, cache hits) of the current span."""
+    current = _current_span.get()
+    if current is not None:
+        with _counter_lock:
+            current.attributes[key] = current.attributes.get(key, 0) + amount
+
+def record_usage(response) -> None:
+    """Add the token usage of an OpenAI- or Mistral-style completion to the current span."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    increment("llm.prompt_tokens", getattr(usage, "prompt_tokens", 0) or 0)
+    increment("llm.completion_tokens", getattr(usage, "completion_tokens", 0) or 0)
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """`executor.submit` that runs `fn` in a copy of the caller's context, so spans nest."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,164 @@
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from utils.lru_cache import LRUCache
+
+# "quote" [MM:SS-MM:SS] or [HH:MM:SS-HH:MM:SS], straight or curly quotes
+QUOTE_PATTERN = re.compile(
+    r'["“](?P<quote>[^"”]{8,}?)["”]\s*'
+    r'\[(?P<start>\d{1,2}(?::\d{2}){1,2})\s*[-–]\s*(?P<end>\d{1,2}(?::\d{2}){1,2})\]'
+)
+APOSTROPHES = re.compile(r"['’]")
+NON_WORD = re.compile(r"[^\w\s]+")
+
+# (video_id, transcript_hash) -> TranscriptAlignment
+alignment_cache = LRUCache(max_items=64)
+
+def normalize(text: str) -> str:
+    """Lowercase, drop apostrophes, split on other punctuation, e.g. "It's ultra-soft." -> "its ultra soft"."""
+    return " ".join(NON_WORD.sub(" ", APOSTROPHES.sub("", text.lower())).split())
+
+def parse_timestamp(stamp: str) -> int:
+    """"MM:SS" or "HH:MM:SS" -> milliseconds."""
+    seconds = 0
+    for part in stamp.split(":"):
+        seconds = seconds * 60 + int(part)
+    return seconds * 1000
+
+def format_timestamp(ms: int) -> str:
+    """Milliseconds -> "MM:SS", or "HH:MM:SS" from one hour on."""
+    seconds = int(ms // 1000)
+    hours, minutes, seconds = seconds // 3600, (seconds % 3600) // 60, seconds % 60
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+@dataclass
+class QuoteMatch:
+    start_ms: int
+    end_ms: int
+    # Fraction of the quote's n-grams found in place, in [0, 1]
+    score: float
+    text: str
+
+class TranscriptAlignment:
+    """Word-level index of a raw transcript for locating quotes.
+
+    The transcript is normalized into one word stream; every word keeps the time it is
+    spoken at, interpolated within its entry, and every word n-gram points to its
+    positions in the stream. A quote is located by letting each of its n-grams vote for
+    where the quote starts, so paraphrased words or small omissions cost a few votes
+    instead of the whole match.
+    """
+    def __init__(self, transcript: List[Dict], ngram: int = 3):
+        self.ngram = ngram
+        self.words: List[str] = []
+        self.start_ms: List[int] = []
+        self.end_ms: List[int] = []
+        for entry in transcript:
+            words = normalize(entry["text"]).split()
+            start, duration = entry["start"] * 1000, entry["duration"] * 1000
+            for j, word in enumerate(words):
+                self.words.append(word)
+                self.start_ms.append(int(start + duration * j / len(words)))
+                self.end_ms.append(int(start + duration * (j + 1) / len(words)))
+        self.index: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        for position in range(len(self.words) - ngram + 1):
+            self.index[tuple(self.words[position:position + ngram])].append(position)
+
+    def match(self, quote: str, slack: int = 2) -> Optional[QuoteMatch]:
+        """Locate a quote in the transcript.
+
+        Args:
+            quote: Quote as written in the answer
+            slack: Words the quote may drift from the transcript (insertions/omissions)
+
+        Returns:
+            Best match, or None if no n-gram of the quote occurs in the transcript or the
+            quote is shorter than one n-gram
+        """
+        words = normalize(quote).split()
+        grams = [tuple(words[i:i + self.ngram]) for i in range(len(words) - self.ngram + 1)]
+        if not grams:
+            return None
+        votes: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        for i, gram in enumerate(grams):
+            for position in self.index.get(gram, ()):
+                votes[position - i].append((i, position))
+        if not votes:
+            return None
+
+        def support(offset: int) -> List[Tuple[int, int]]:
+            return [hit for o in range(offset - slack, offset + slack + 1) for hit in votes.get(o, ())]
+
+        offset = max(votes, key=lambda o: (len({i for i, _ in support(o)}), -o))
+        hits = support(offset)
+        matched = {i for i, _ in hits}
+        # Project the first and last matched n-grams onto the quote's own boundaries
+        first_i, first_position = min(hits)
+        last_i, last_position = max(hits)
+        start = max(0, first_position - first_i)
+        end = min(len(self.words) - 1, last_position + (len(words) - 1 - last_i))
+        return QuoteMatch(
+            start_ms=self.start_ms[start],
+            end_ms=self.end_ms[end],
+            score=len(matched) / len(grams),
+            text=" ".join(self.words[start:end + 1]),
+        )
+
+def align_answer(
+    answer: str,
+    alignments: List[TranscriptAlignment],
+    min_score: float = 0.6,
+    tolerance_s: float = 3.0,
+) -> Tuple[str, Dict]:
+    """Check every `"quote" [start-end]` of an answer against the transcripts.
+
+    Quotes found in a transcript get the timestamps where they are actually spoken if
+    the stated start is more than `tolerance_s` off; quotes found nowhere are flagged.
+
+    Args:
+        answer: Answer text with timestamped quotes
+        alignments: Alignments of the videos the answer may quote from
+
+    Returns:
+        Tuple of (answer with corrected/flagged timestamps, report with verified,
+        corrected and unverified counts and one entry per quote with times in ms)
+    """
+    report = {"verified": 0, "corrected": 0, "unverified": 0, "quotes": []}
+    if not alignments:
+        return answer, report
+
+    def check(m: re.Match) -> str:
+        stated_start, stated_end = parse_timestamp(m.group("start")), parse_timestamp(m.group("end"))
+        matches = [match for match in (a.match(m.group("quote")) for a in alignments) if match]
+        best = max(matches, key=lambda match: match.score, default=None)
+        entry = {"quote": m.group("quote"), "stated_ms": [stated_start, stated_end]}
+        report["quotes"].append(entry)
+        if best is None or best.score < min_score:
+            report["unverified"] += 1
+            entry["status"] = "unverified"
+            return f"{m.group(0)} *(quote not found in the transcript)*"
+        entry["matched_ms"] = [best.start_ms, best.end_ms]
+        entry["score"] = best.score
+        if abs(best.start_ms - stated_start) <= tolerance_s * 1000:
+            report["verified"] += 1
+            entry["status"] = "verified"
+            return m.group(0)
+        report["corrected"] += 1
+        entry["status"] = "corrected"
+        quote_end = m.start("start") - m.start(0) - 1
+        return f"{m.group(0)[:quote_end]}[{format_timestamp(best.start_ms)}-{format_timestamp(best.end_ms)}]"
+
+    return QUOTE_PATTERN.sub(check, answer), report
+
+def merge_reports(reports: List[Dict]) -> Dict:
+    """Combine the `align_answer` reports of several answers into one."""
+    merged = {"verified": 0, "corrected": 0, "unverified": 0, "quotes": []}
+    for report in reports:
+        for key in ("verified", "corrected", "unverified"):
+            merged[key] += report[key]
+        merged["quotes"].extend(report["quotes"])
+    return merged
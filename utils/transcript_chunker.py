@@ -0,0 +1,68 @@
+from typing import Dict, List
+
+import numpy as np
+
+SENTENCE_ENDINGS = (".", "?", "!")
+
+def chunk_transcript(
+    transcript: List[Dict],
+    max_tokens: int = 160,
+    overlap_tokens: int = 32,
+    long_video_s: float = 3600,
+    long_video_scale: int = 2,
+) -> List[Dict]:
+    """Split transcript entries into token-bounded, overlapping windows.
+
+    Works in one pass over arrays of entry starts, ends and cumulative token counts
+    (tokens are approximated by whitespace-separated words). A window is cut at the
+    last sentence end in its second half when there is one, and the next window
+    starts far enough back to repeat about `overlap_tokens` tokens. Videos longer
+    than `long_video_s` get windows `long_video_scale` times larger.
+
+    Args:
+        transcript: entries with text, start and duration (seconds)
+
+    Returns:
+        List of chunks with text, start_time, end_time and duration, where the times
+        are the exact start of the first and end of the last entry of the window
+    """
+    entries = [entry for entry in transcript if entry["text"].strip()]
+    if not entries:
+        return []
+
+    texts = [" ".join(entry["text"].split()) for entry in entries]
+    starts = np.array([entry["start"] for entry in entries], dtype=np.float64)
+    ends = starts + np.array([entry["duration"] for entry in entries], dtype=np.float64)
+    tokens = np.array([len(text.split()) for text in texts], dtype=np.int64)
+    cumulative = np.concatenate(([0], np.cumsum(tokens)))
+    sentence_end = np.array([text.endswith(SENTENCE_ENDINGS) for text in texts])
+
+    if ends.max() - starts[0] > long_video_s:
+        max_tokens *= long_video_scale
+        overlap_tokens *= long_video_scale
+
+    n = len(entries)
+    chunks = []
+    lo = 0
+    while lo < n:
+        # Largest hi with tokens[lo:hi] <= max_tokens, at least one entry
+        hi = int(np.searchsorted(cumulative, cumulative[lo] + max_tokens, side="right")) - 1
+        hi = min(max(hi, lo + 1), n)
+        if hi < n:
+            half = int(np.searchsorted(cumulative, cumulative[lo] + max_tokens // 2, side="left"))
+            candidates = np.flatnonzero(sentence_end[max(half - 1, lo):hi]) + max(half - 1, lo)
+            if len(candidates):
+                hi = int(candidates[-1]) + 1
+
+        chunks.append({
+            "text": " ".join(texts[lo:hi]),
+            "start_time": float(starts[lo]),
+            "end_time": float(ends[lo:hi].max()),
+            "duration": float(ends[lo:hi].max() - starts[lo]),
+        })
+        if hi >= n:
+            break
+        # Step back so the next window repeats about `overlap_tokens` tokens
+        next_lo = int(np.searchsorted(cumulative, cumulative[hi] - overlap_tokens, side="left"))
+        lo = min(max(next_lo, lo + 1), hi)
+    return chunks
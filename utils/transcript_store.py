@@ -0,0 +1,322 @@
+import sys
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+# Handle SQLite version requirement for ChromaDB
+try:
+    import pysqlite3
+    sys.modules['sqlite3'] = pysqlite3
+except ImportError:
+    pass
+
+import sqlite3
+import chromadb
+from chromadb import Settings
+
+from config import CacheConfig, VideoStoreConfig
+from utils.embeddings import EmbeddingProvider, get_embedding_provider
+
+# Rough cost of one chunk beyond its text (embedding, HNSW links, metadata), used for
+# the size estimates that `max_estimated_bytes` applies to; nothing is measured on disk
+CHUNK_OVERHEAD_BYTES = 2048
+
+class TranscriptStore:
+    """Process-wide persistent store of YouTube transcript chunks.
+
+    All videos share one Chroma collection, named after the embedding model; every
+    chunk carries its `video_id` in the metadata and has the id `<video_id>_chunk_<n>`.
+    Switching models drops the previous collection and registry, since its vectors
+    cannot be queried with the new model. A small SQLite registry next to it
+    keeps the metadata of each indexed video, the raw transcript it was built from
+    (for quote alignment) and its hash, and its estimated size and last access, which drive LRU eviction once
+    `max_videos` or `max_estimated_bytes` is exceeded. The size budget is approximate:
+    it counts estimated chunk sizes, and the Chroma files do not shrink on delete.
+    """
+    def __init__(
+        self,
+        path: str,
+        collection_name: str,
+        max_videos: int,
+        max_estimated_bytes: int,
+        embed_batch_size: int = 64,
+        add_batch_size: int = 512,
+        embedding_provider: Optional[EmbeddingProvider] = None,
+    ):
+        os.makedirs(path, exist_ok=True)
+        self.max_videos = max_videos
+        self.max_estimated_bytes = max_estimated_bytes
+        self.embed_batch_size = embed_batch_size
+        self.add_batch_size = add_batch_size
+        self.embedding_function = embedding_provider or get_embedding_provider()
+        self.collection_name = f"{collection_name}_{self.embedding_function.slug}"
+        self._lock = threading.Lock()
+        self.chroma_client = chromadb.PersistentClient(
+            path=os.path.join(path, "chroma"),
+            settings=Settings(anonymized_telemetry=False),
+        )
+        self.collection = self.chroma_client.get_or_create_collection(
+            name=self.collection_name,
+            embedding_function=self.embedding_function,
+            metadata={"hnsw:space": "cosine"}
+        )
+        self._conn = sqlite3.connect(os.path.join(path, "videos.sqlite3"), check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS videos(
+                video_id TEXT PRIMARY KEY,
+                title TEXT,
+                author TEXT,
+                upload_date TEXT,
+                url TEXT,
+                chunk_count INTEGER,
+                size_bytes INTEGER,
+                added_at REAL,
+                accessed_at REAL,
+                transcript_hash TEXT,
+                transcript TEXT
+            )
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(videos)")}
+        for column in ("transcript_hash", "transcript"):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE videos ADD COLUMN {column} TEXT")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS store_settings(key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+        self._switch_collection()
+
+    def _switch_collection(self) -> None:
+        """Forget videos indexed into another model's collection and remove that collection."""
+        row = self._conn.execute("SELECT value FROM store_settings WHERE key = 'collection'").fetchone()
+        if row is not None and row[0] != self.collection_name:
+            if row[0] in {c if isinstance(c, str) else c.name for c in self.chroma_client.list_collections()}:
+                print(f"Embedding model changed: dropping transcript collection {row[0]}")
+                self.chroma_client.delete_collection(row[0])
+            self._conn.execute("DELETE FROM videos")
+        self._conn.execute(
+            "INSERT OR REPLACE INTO store_settings(key, value) VALUES ('collection', ?)", (self.collection_name,)
+        )
+        self._conn.commit()
+
+    def has_video(self, video_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row is not None
+
+    def get_metadata(self, video_id: str) -> Optional[Dict]:
+        """Return title, author, upload_date (datetime) and url of an indexed video."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT title, author, upload_date, url FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "title": row[0],
+            "author": row[1],
+            "upload_date": datetime.fromisoformat(row[2]),
+            "url": row[3],
+        }
+
+    def get_transcript_hash(self, video_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT transcript_hash FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row[0] if row else None
+
+    def get_transcript(self, video_id: str) -> Optional[List[Dict]]:
+        """Raw transcript entries (text, start, duration) of an indexed video, if stored."""
+        with self._lock:
+            row = self._conn.execute("SELECT transcript FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def put_transcript(self, video_id: str, transcript: List[Dict]) -> None:
+        """Store the raw transcript of a video indexed before transcripts were kept."""
+        payload = dump_transcript(transcript)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE videos SET transcript = ?, size_bytes = size_bytes + ? WHERE video_id = ?",
+                (payload, len(payload.encode("utf-8")), video_id),
+            )
+            self._conn.commit()
+
+    def update_metadata(self, video_id: str, metadata: Dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE videos SET title = ?, author = ?, upload_date = ?, url = ?, accessed_at = ? WHERE video_id = ?",
+                (metadata["title"], metadata["author"], metadata["upload_date"].isoformat(), metadata["url"], time.time(), video_id),
+            )
+            self._conn.commit()
+
+    def touch(self, video_id: str) -> None:
+        with self._lock:
+            self._conn.execute("UPDATE videos SET accessed_at = ? WHERE video_id = ?", (time.time(), video_id))
+            self._conn.commit()
+
+    def add_video(
+        self,
+        video_id: str,
+        metadata: Dict,
+        chunks: List[Dict],
+        transcript_hash: Optional[str] = None,
+        transcript: Optional[List[Dict]] = None,
+    ) -> Dict:
+        """Index the chunks of a video, replacing any previous version of it.
+
+        Chunks are embedded in batches of `embed_batch_size` and inserted with one
+        `collection.add` per `add_batch_size` chunks, instead of one embedding and
+        HNSW insert per chunk.
+
+        Args:
+            video_id: YouTube video ID
+            metadata: title, author, upload_date (datetime) and url
+            chunks: dicts with text, start_time and duration
+            transcript_hash: `hash_transcript` of the transcript the chunks came from
+            transcript: Raw transcript entries, kept to verify quoted timestamps
+
+        Returns:
+            Dict: chunks, embed_s, add_s and chunks_per_s of the ingest
+        """
+        self.delete_video(video_id)
+        documents = [chunk["text"].strip() for chunk in chunks]
+        start = time.perf_counter()
+        embeddings = self.embed(documents)
+        embedded_at = time.perf_counter()
+        for batch_start in range(0, len(chunks), self.add_batch_size):
+            batch = range(batch_start, min(batch_start + self.add_batch_size, len(chunks)))
+            self.collection.add(
+                documents=[documents[i] for i in batch],
+                embeddings=[embeddings[i] for i in batch],
+                metadatas=[
+                    {
+                        "video_id": video_id,
+                        "start_time": chunks[i]["start_time"],
+                        "duration": chunks[i]["duration"],
+                        "chunk_id": i
+                    }
+                    for i in batch
+                ],
+                ids=[f"{video_id}_chunk_{i}" for i in batch]
+            )
+        end = time.perf_counter()
+        stats = {
+            "chunks": len(chunks),
+            "embed_s": embedded_at - start,
+            "add_s": end - embedded_at,
+            "chunks_per_s": len(chunks) / (end - start) if end > start else 0.0,
+        }
+        print(f"Indexed video {video_id}: {stats['chunks']} chunks at {stats['chunks_per_s']:.0f} chunks/s "
+              f"(embed {stats['embed_s']:.2f}s, add {stats['add_s']:.2f}s)")
+        payload = dump_transcript(transcript) if transcript else None
+        size_bytes = sum(len(chunk["text"].encode("utf-8")) + CHUNK_OVERHEAD_BYTES for chunk in chunks)
+        size_bytes += len(payload.encode("utf-8")) if payload else 0
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO videos(video_id, title, author, upload_date, url, chunk_count, size_bytes, added_at, accessed_at, transcript_hash, transcript) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    video_id, metadata["title"], metadata["author"], metadata["upload_date"].isoformat(),
+                    metadata["url"], len(chunks), size_bytes, now, now, transcript_hash, payload,
+                ),
+            )
+            self._conn.commit()
+        self._evict(keep=video_id)
+        return stats
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the shared provider in batches of `embed_batch_size`."""
+        return self.embedding_function.embed(texts, batch_size=self.embed_batch_size)
+
+    def delete_video(self, video_id: str) -> None:
+        self.collection.delete(where={"video_id": video_id})
+        with self._lock:
+            self._conn.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+            self._conn.commit()
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used videos until the store is within its quotas."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, size_bytes FROM videos ORDER BY accessed_at"
+            ).fetchall()
+        count = len(rows)
+        total = sum(size for _, size in rows)
+        for video_id, size in rows:
+            if count <= self.max_videos and total <= self.max_estimated_bytes:
+                break
+            if video_id == keep:
+                continue
+            print(f"Evicting transcript of video {video_id} from the store")
+            self.delete_video(video_id)
+            count -= 1
+            total -= size
+
+    def list_videos(self) -> List[Dict]:
+        """Indexed videos, most recently used first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_id, title, author, chunk_count FROM videos ORDER BY accessed_at DESC"
+            ).fetchall()
+        return [{"video_id": r[0], "title": r[1], "author": r[2], "chunk_count": r[3]} for r in rows]
+
+    def query(self, questions: Union[str, List[str]], video_ids: Optional[List[str]] = None, n_results: int = 5) -> Dict:
+        """Rank chunks for one or more questions in a single Chroma query.
+
+        Args:
+            questions: A question or a batch of questions (one result list each)
+            video_ids: Restrict to these videos; None searches every indexed video
+            n_results: Chunks per question
+        """
+        if isinstance(questions, str):
+            questions = [questions]
+        if not video_ids:
+            where_clause = None
+        elif len(video_ids) == 1:
+            where_clause = {"video_id": video_ids[0]}
+        else:
+            where_clause = {"video_id": {"$in": list(video_ids)}}
+        for video_id in video_ids or []:
+            self.touch(video_id)
+        return self.collection.query(
+            query_texts=questions,
+            n_results=n_results,
+            where=where_clause
+        )
+
+def dump_transcript(transcript: List[Dict]) -> str:
+    """Compact JSON of transcript entries, keeping only text, start and duration."""
+    return json.dumps(
+        [{"text": entry["text"], "start": entry["start"], "duration": entry["duration"]} for entry in transcript],
+        separators=(",", ":"),
+    )
+
+def hash_transcript(transcript: List[Dict]) -> str:
+    """Stable hash of transcript entries (text, start, duration)."""
+    payload = json.dumps(
+        [[entry["text"], entry["start"], entry["duration"]] for entry in transcript],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+_transcript_store: Optional[TranscriptStore] = None
+_transcript_store_lock = threading.Lock()
+
+def get_transcript_store() -> TranscriptStore:
+    """Return the process-wide transcript store, opening it on first use."""
+    global _transcript_store
+    if _transcript_store is None:
+        with _transcript_store_lock:
+            if _transcript_store is None:
+                config = VideoStoreConfig()
+                _transcript_store = TranscriptStore(
+                    os.path.join(CacheConfig().cache_dir, "transcripts"),
+                    collection_name=config.collection_name,
+                    max_videos=config.max_videos,
+                    max_estimated_bytes=config.max_estimated_bytes,
+                    embed_batch_size=config.embed_batch_size,
+                    add_batch_size=config.add_batch_size,
+                )
+    return _transcript_store
@@ -1,3 +1,5 @@
+from typing import ClassVar
+
 import numpy as np
 from trulens.core import Feedback
 from trulens.core import Select
@@ -7,11 +9,32 @@ from trulens.providers.openai import OpenAI as OpenAIProvider
 from dotenv import load_dotenv
 
 from config import OPENAPI_KEY
+from utils.llm_governor import Priority, get_governor
 
 load_dotenv()
 
+class GovernedProvider:
+    """Mixin routing the completions of a TruLens LLM provider through the LLM governor."""
+    governor_key: ClassVar[str]
+    priority: ClassVar[Priority]
+
+    def _create_chat_completion(self, *args, **kwargs):
+        return get_governor().call(
+            self.governor_key, self.priority, super()._create_chat_completion, *args, **kwargs
+        )
+
+class GovernedCortexProvider(GovernedProvider, Cortex):
+    """Cortex provider of the evaluation feedbacks, which queue behind user-facing calls."""
+    governor_key: ClassVar[str] = "cortex"
+    priority: ClassVar[Priority] = Priority.BACKGROUND
+
+class GuardrailOpenAIProvider(GovernedProvider, OpenAIProvider):
+    """Provider of the context-filter guardrail, which runs inline on every agent-mode request."""
+    governor_key: ClassVar[str] = "openai"
+    priority: ClassVar[Priority] = Priority.AGENT
+
 def get_trulens_feedbacks(snowpark_session: Session):
-    provider = Cortex(snowpark_session, "llama3.1-8b")
+    provider = GovernedCortexProvider(snowpark_session, "llama3.1-8b")
 
     # Define a groundedness feedback function
     f_groundedness = (
@@ -39,7 +62,7 @@ def get_trulens_feedbacks(snowpark_session: Session):
     return feedbacks
 
 def get_f_guardrail():
-    fopenai_provider = OpenAIProvider(model_engine="gpt-4o-mini", api_key=OPENAPI_KEY)
+    fopenai_provider = GuardrailOpenAIProvider(model_engine="gpt-4o-mini", api_key=OPENAPI_KEY)
     f_guardrail = Feedback(
         fopenai_provider.context_relevance, name="Context Relevance"
     )
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from config import CacheConfig
+
+class WebCache:
+    """Disk-backed cache of extracted web pages and search engine results.
+
+    Pages are keyed by URL and keep the validators (ETag / Last-Modified) of the
+    response they came from, so stale entries can be revalidated with a conditional
+    request instead of a full download. The page table is kept under `max_bytes` by
+    evicting the least recently used entries.
+    """
+    def __init__(self, path: str, page_ttl_s: int, search_ttl_s: int, max_bytes: int):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.page_ttl_s = page_ttl_s
+        self.search_ttl_s = search_ttl_s
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages(
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content TEXT,
+                size INTEGER,
+                fetched_at REAL,
+                accessed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS pages_accessed_at ON pages(accessed_at);
+            CREATE TABLE IF NOT EXISTS searches(
+                query TEXT,
+                max_results INTEGER,
+                urls TEXT,
+                fetched_at REAL,
+                PRIMARY KEY (query, max_results)
+            );
+        """)
+        self._conn.commit()
+
+    def get_page(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for `url` with a `fresh` flag, or None if never fetched."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (now, url))
+            self._conn.commit()
+        etag, last_modified, content, fetched_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content": json.loads(content),
+            "fresh": now - fetched_at < self.page_ttl_s,
+        }
+
+    def put_page(self, url: str, content: Dict[str, Any], etag: str = None, last_modified: str = None) -> None:
+        data = json.dumps(content)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages(url, etag, last_modified, content, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, data, len(data), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, url: str) -> None:
+        """Mark a cached page as fresh again after a 304 Not Modified."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self._conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall():
+            self._conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def get_search(self, query: str, max_results: int) -> Optional[List[dict]]:
+        """Return cached search result URLs (startUrls format) within the search TTL."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT urls, fetched_at FROM searches WHERE query = ? AND max_results = ?", (query, max_results)
+            ).fetchone()
+        if row is None or time.time() - row[1] >= self.search_ttl_s:
+            return None
+        return json.loads(row[0])
+
+    def put_search(self, query: str, max_results: int, urls: List[dict]) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches(query, max_results, urls, fetched_at) VALUES (?, ?, ?, ?)",
+                (query, max_results, json.dumps(urls), time.time()),
+            )
+            self._conn.commit()
+
+_web_cache: Optional[WebCache] = None
+_web_cache_lock = threading.Lock()
+
+def get_web_cache() -> WebCache:
+    """Return the process-wide web cache, creating the database on first use."""
+    global _web_cache
+    if _web_cache is None:
+        with _web_cache_lock:
+            if _web_cache is None:
+                config = CacheConfig()
+                _web_cache = WebCache(
+                    os.path.join(config.cache_dir, "web.sqlite3"),
+                    page_ttl_s=config.web_page_ttl_s,
+                    search_ttl_s=config.web_search_ttl_s,
+                    max_bytes=config.web_max_bytes,
+                )
+    return _web_cache
@@ -0,0 +1,196 @@
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from bs4 import BeautifulSoup
+
+HEADER_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+def extract_page(html: str, url: str) -> Dict[str, Any]:
+    """Extract title, headers, paragraphs, lists and tables from an HTML page.
+
+    Same extraction as the `pageFunction` run by the apify/beautifulsoup-scraper actor
+    (`assistance.web_search_agent`), so both scraper backends return the same items.
+    The main content area is found with CSS selectors (`select_one`), so `#content`
+    and `.content` match by id and class.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Initialize data structure
+    data = {
+        'url': url,
+        'title': soup.title.string.strip() if soup.title and soup.title.string else None,
+        'content': {},
+    }
+
+    # Find main content area with multiple fallback options
+    main_content = None
+    for selector in ['main', 'article', '#content', '.content', 'body']:
+        main_content = soup.select_one(selector)
+        if main_content:
+            break
+
+    if main_content:
+        # Extract structured content
+        data['content']['headers'] = [
+            {'level': h.name, 'text': h.text.strip()}
+            for h in main_content.find_all(HEADER_TAGS)
+            if h.text.strip()
+        ]
+
+        data['content']['paragraphs'] = [
+            p.text.strip()
+            for p in main_content.find_all('p')
+            if p.text.strip() and len(p.text.strip()) > 20  # Filter out short snippets
+        ]
+
+        # Extract lists with context
+        data['content']['lists'] = []
+        for lst in main_content.find_all(['ul', 'ol']):
+            list_items = [li.text.strip() for li in lst.find_all('li') if li.text.strip()]
+            if list_items:
+                # Try to find a header or label for this list
+                list_context = None
+                prev_elem = lst.find_previous(HEADER_TAGS + ['label'])
+                if prev_elem:
+                    list_context = prev_elem.text.strip()
+
+                data['content']['lists'].append({
+                    'type': lst.name,  # 'ul' or 'ol'
+                    'context': list_context,
+                    'items': list_items
+                })
+
+        # Extract any tables
+        data['content']['tables'] = []
+        for table in main_content.find_all('table'):
+            table_data = []
+            for row in table.find_all('tr'):
+                cols = row.find_all(['td', 'th'])
+                table_data.append([col.text.strip() for col in cols])
+            if table_data:
+                data['content']['tables'].append(table_data)
+
+    return data
+
+class PageFetcher:
+    """Concurrent in-process page fetcher and extractor.
+
+    Runs its own event loop in a daemon thread so one pooled `httpx.AsyncClient` is
+    reused by every (synchronous) caller. Requests are limited per host and time out
+    individually; pages that fail are skipped.
+
+    With a `cache` (see `utils.web_cache.WebCache`), fresh pages are served without a
+    request and stale ones are revalidated with If-None-Match / If-Modified-Since.
+    """
+    def __init__(
+        self,
+        request_timeout_s: float = 15.0,
+        per_host_limit: int = 2,
+        max_connections: int = 20,
+        cache=None,
+    ):
+        self.request_timeout_s = request_timeout_s
+        self.per_host_limit = per_host_limit
+        self.max_connections = max_connections
+        self.cache = cache
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        with self._start_lock:
+            if self._loop is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            threading.Thread(target=self._loop.run_forever, name="page-fetcher", daemon=True).start()
+
+            async def make_client():
+                return httpx.AsyncClient(
+                    timeout=self.request_timeout_s,
+                    follow_redirects=True,
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections // 2,
+                    ),
+                )
+
+            self._client = asyncio.run_coroutine_threadsafe(make_client(), self._loop).result()
+
+    def fetch(self, urls: List[str], headers: Optional[dict] = None) -> List[Dict[str, Any]]:
+        """Fetch and extract `urls` concurrently.
+
+        Returns:
+            List of extracted pages in the order of `urls`, failed pages omitted
+        """
+        return [page for page, _ in self.fetch_with_cache_status(urls, headers) if page is not None]
+
+    def fetch_with_cache_status(
+        self, urls: List[str], headers: Optional[dict] = None, timeout: Optional[float] = None,
+    ) -> List[Tuple[Optional[Dict[str, Any]], bool]]:
+        """Like `fetch`, but returns `(page or None, served from cache)` for every url.
+
+        With `timeout`, pages not fetched within that many seconds are cancelled on the
+        event loop and reported as failed.
+        """
+        if not urls:
+            return []
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(self._fetch_all(urls, headers or {}, timeout), self._loop)
+        # Each request already has its own timeout; this only guards against a stuck loop
+        return future.result(timeout=(timeout or self.request_timeout_s) * (len(urls) + 1))
+
+    async def _fetch_all(self, urls: List[str], headers: dict, timeout: Optional[float] = None) -> List[Tuple[Optional[Dict[str, Any]], bool]]:
+        return await asyncio.gather(*(self._fetch_one_within(url, headers, timeout) for url in urls))
+
+    async def _fetch_one_within(self, url: str, headers: dict, timeout: Optional[float]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        try:
+            return await asyncio.wait_for(self._fetch_one(url, headers), timeout)
+        except asyncio.TimeoutError:
+            print(f"Skipping {url}: not fetched within {timeout:.1f}s")
+            return None, False
+
+    async def _fetch_one(self, url: str, headers: dict) -> Tuple[Optional[Dict[str, Any]], bool]:
+        cached = self.cache.get_page(url) if self.cache is not None else None
+        if cached is not None and cached["fresh"]:
+            return cached["content"], True
+        if cached is not None:
+            headers = dict(headers)
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlparse(url).netloc
+        limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        try:
+            async with limit:
+                response = await self._client.get(url, headers=headers)
+            if response.status_code == 304 and cached is not None:
+                self.cache.touch(url)
+                return cached["content"], True
+            if response.status_code >= 400:
+                print(f"Skipping {url}: HTTP {response.status_code}")
+                return None, False
+            # Parsing is CPU-bound, keep it off the event loop
+            page = await asyncio.get_running_loop().run_in_executor(None, extract_page, response.text, url)
+            if self.cache is not None:
+                self.cache.put_page(
+                    url, page,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                )
+            return page, False
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Skipping {url}: {e!r}")
+            return None, False
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop = None
@@ -0,0 +1,113 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import YouTubeConfig
+from utils.lru_cache import LRUCache
+
+UPLOAD_DATE_PATTERN = re.compile(rb'"uploadDate":"([^"]+)"')
+
+youtube_config = YouTubeConfig()
+
+# Pooled connections to YouTube, shared by every session
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+http_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Runs metadata lookups next to the transcript download
+metadata_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="youtube-metadata")
+
+# video_id -> metadata dict
+metadata_cache = LRUCache(max_items=1024)
+
+def fetch_upload_date(video_id: str, base_url: str, timeout: float, max_bytes: int) -> Optional[datetime]:
+    """Stream the watch page and stop reading as soon as `uploadDate` has been seen."""
+    buffer = b""
+    read = 0
+    with http_session.get(f"{base_url}/watch?v={video_id}", stream=True, timeout=timeout) as response:
+        if response.status_code != 200:
+            return None
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            read += len(chunk)
+            # Keep a tail so a match split across chunks is still found
+            buffer = buffer[-256:] + chunk
+            match = UPLOAD_DATE_PATTERN.search(buffer)
+            if match:
+                # Extract just the date part (YYYY-MM-DD) from the ISO timestamp
+                return datetime.strptime(match.group(1).decode().split('T')[0], "%Y-%m-%d")
+            if read >= max_bytes:
+                break
+    return None
+
+def fetch_video_metadata(video_id: str, config: YouTubeConfig = youtube_config) -> Dict:
+    """Fetch title, author, embed HTML and upload date of a video, cached per video_id.
+
+    Safe to call from worker threads (no Streamlit calls). Lookups that fail fall
+    back to placeholders and are not cached.
+
+    Returns:
+        Dict with title, author, embed_html, upload_date (datetime) and url
+    """
+    cached = metadata_cache.get(video_id)
+    if cached is not None:
+        return cached
+
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    metadata = {
+        "title": "Untitled Video",
+        "author": "Unknown Author",
+        "embed_html": "",
+        "upload_date": datetime.now(),
+        "url": video_url,
+    }
+    try:
+        response = http_session.get(
+            f"{config.base_url}/oembed",
+            params={"url": video_url, "format": "json"},
+            timeout=config.request_timeout_s,
+        )
+        response.raise_for_status()
+        data = response.json()
+        metadata.update(
+            title=data.get("title", "Untitled Video"),
+            author=data.get("author_name", "Unknown Author"),
+            embed_html=data.get("html", ""),
+        )
+    except (requests.RequestException, ValueError) as e:
+        print(f"Error fetching video metadata for {video_id}: {e}")
+        return metadata
+
+    try:
+        upload_date = fetch_upload_date(
+            video_id, config.base_url, config.request_timeout_s, config.max_watch_page_bytes
+        )
+        if upload_date:
+            metadata["upload_date"] = upload_date
+    except (requests.RequestException, ValueError) as e:
+        print(f"Could not parse upload date for {video_id}: {e}")
+
+    metadata_cache.put(video_id, metadata)
+    return metadata
+
+def fetch_transcript_with_metadata(
+    video_id: str,
+    fetch_transcript: Callable[[str], List[Dict]],
+    config: YouTubeConfig = youtube_config,
+) -> Tuple[List[Dict], Dict]:
+    """Download the transcript of a video while its metadata is fetched on `metadata_executor`.
+
+    Args:
+        video_id: YouTube video ID
+        fetch_transcript: Called with `video_id` on the calling thread, e.g.
+            `YouTubeTranscriptApi.get_transcript`
+
+    Returns:
+        Tuple of (transcript entries, metadata dict)
+    """
+    metadata_future = metadata_executor.submit(fetch_video_metadata, video_id, config)
+    transcript = fetch_transcript(video_id)
+    return transcript, metadata_future.result()